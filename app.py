@@ -1,5 +1,6 @@
 import streamlit as st
-from load_data import get_sp500_data
+from load_data import get_sp500_data, get_data_quality
+from instrumentation import render_debug_panel
 
 # Page configuration
 st.set_page_config(
@@ -33,6 +34,9 @@ Use the **sidebar** to explore different sections:
 - **📊 EDA Gallery** - Explore 4+ different chart types analyzing S&P 500 data
 - **📈 Dashboard** - Interactive dashboard with filters and insights
 - **🧭 Future Work** - Planned enhancements and reflections
+- **🔎 Screener** - Rank every stock by return, volatility, volume surge, drawdown or distance from its 52-week high
+- **🎲 Monte Carlo** - Simulate future portfolio paths with fan charts and VaR/CVaR
+- **🧬 Similar Stocks** - Find the stocks whose returns move most (and least) like a given symbol
 
 """)
 
@@ -64,7 +68,7 @@ st.markdown("---")
 # Quick data preview
 st.markdown("## 📋 Quick Data Preview")
 
-tab1, tab2, tab3 = st.tabs(["Companies", "Stock Prices", "S&P 500 Index"])
+tab1, tab2, tab3, tab4 = st.tabs(["Companies", "Stock Prices", "S&P 500 Index", "Data Quality"])
 
 with tab1:
     st.markdown("**Company Information (502 companies)**")
@@ -85,8 +89,19 @@ with tab3:
     st.dataframe(index_df.head(10), use_container_width=True)
     st.line_chart(index_df.set_index('Date')['S&P500'], use_container_width=True)
 
+with tab4:
+    quality_report, symbol_ranges = get_data_quality()
+    st.markdown("**Checks run once when the data is loaded**")
+    st.dataframe(quality_report, hide_index=True, width='stretch')
+    st.caption(f"{quality_report.loc[quality_report['Action'] != 'Reported', 'Rows'].sum():,} rows flagged for removal before any page sees the data (a row can fail more than one check)")
+
+    st.markdown("**Price history per company**")
+    st.dataframe(symbol_ranges, width='stretch')
+
 st.markdown("---")
 
 # Footer
 st.caption("Created by Nathan G | MSU Denver CS Project 2 | Fall 2025")
 st.caption("Data automatically updated daily via KaggleHub")
+
+render_debug_panel()
@@ -0,0 +1,385 @@
+"""
+Batch report generation: static snapshots of the EDA Gallery and Dashboard
+without `streamlit run`.
+
+The dataset is loaded (and validated) once in the parent process. Presets
+are then rendered in a process pool whose workers inherit the loaded tables
+by fork, so no worker re-reads or re-pickles the CSVs. Every chart is drawn
+with the same computation functions (computations.py, indices.py) and
+figure builders (figures.py) as the pages. The drawdown event study covers
+the whole market, so its deepest episode is measured once in the parent and
+every preset only writes it out.
+
+    python batch_report.py --output-dir reports/
+    python batch_report.py --presets presets.json --processes 4 --png
+
+A presets file is a JSON list of Dashboard filter settings; omitted fields
+fall back to the full date range, all sectors/exchanges and the top 50:
+
+    [
+      {"name": "tech_2023", "start_date": "2023-01-01", "sectors": ["Technology"]},
+      {"name": "nasdaq_top100", "exchanges": ["NASDAQ"], "top_n": 100}
+    ]
+
+Output: one folder per preset (KPIs, summary tables as CSV, charts as HTML
+and, if kaleido is installed and --png is given, PNG; the drawdown event
+study is drawn for the deepest episode only), an `eda/` folder, an
+index.html linking everything and summary.json with timings and throughput.
+"""
+
+import argparse
+import html
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# The cached get_* wrappers warn about the missing Streamlit runtime at import;
+# this script only calls the plain functions
+import streamlit  # noqa: F401
+logging.getLogger("streamlit.runtime.caching.cache_data_api").setLevel(logging.ERROR)
+
+from load_data import load_sp500_data
+from computations import (
+    EXCHANGE_NAMES, named_exchanges, calculate_volatility, revenue_growth, revenue_growth_box_stats,
+    revenue_growth_summary, filter_options, merge_company_info, filter_stocks, compute_kpis, sector_correlation,
+    exchange_volume
+)
+from indices import WEIGHTINGS, build_indices, rebase
+from drawdowns import DEFAULT_THRESHOLD, index_series, drawdown, drawdown_episodes, episode_label, episode_stats
+from price_matrix import build_price_matrix
+from box_stats import return_box_stats
+from price_modes import PRICE_MODES, price_column
+import figures
+
+# Dataset shared with pool workers (set in the parent before forking)
+_shared = {}
+
+
+def default_presets(all_sectors):
+    """
+    The Dashboard's default view, the whole market, and one preset per sector.
+    """
+    presets = [
+        {'name': 'dashboard_default', 'sectors': all_sectors[:3], 'exchanges': ['NYSE', 'NASDAQ']},
+        {'name': 'all_top100', 'top_n': 100},
+    ]
+    presets += [{'name': f'sector_{slug(sector)}', 'sectors': [sector]} for sector in all_sectors]
+    return presets
+
+
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def resolve_preset(preset, min_date, max_date):
+    """
+    Filter arguments (start, end, sectors, exchanges, top_n) for a preset,
+    accepting exchange names (NYSE) as well as codes (NYQ).
+    """
+    codes = {name: code for code, name in EXCHANGE_NAMES.items()}
+    start = pd.to_datetime(preset.get('start_date', min_date)).date()
+    end = pd.to_datetime(preset.get('end_date', max_date)).date()
+    sectors = tuple(preset.get('sectors', ()))
+    exchanges = tuple(codes.get(exchange, exchange) for exchange in preset.get('exchanges', ()))
+    return max(start, min_date), min(end, max_date), sectors, exchanges, int(preset.get('top_n', 50))
+
+
+def deepest_drawdown(companies_df, stocks_df, index_df, threshold):
+    """
+    S&P 500 levels plus the deepest drawdown episode and its (symbol stats,
+    sector stats), as on the Dashboard; episode and stats are None if the
+    index never fell `threshold` below a previous high.
+    """
+    levels = index_series(index_df)
+    episodes = drawdown_episodes(levels, threshold)
+    if episodes.empty:
+        return {'levels': levels, 'episode': None, 'stats': None}
+    episode = episodes.iloc[0]
+    prices = build_price_matrix(stocks_df, 'Adj Close')
+    return {'levels': levels, 'episode': episode, 'stats': episode_stats(prices, levels, companies_df, episode)}
+
+
+# ====================
+# RENDERING
+# ====================
+
+def write_figure(fig, out_dir, name, png):
+    """
+    Writes fig as <name>.html (plotly.js from CDN) and optionally <name>.png.
+    Returns the written file names.
+    """
+    files = [f'{name}.html']
+    fig.write_html(os.path.join(out_dir, files[0]), include_plotlyjs='cdn')
+    if png:
+        fig.write_image(os.path.join(out_dir, f'{name}.png'))
+        files.append(f'{name}.png')
+    return files
+
+
+def render_eda(out_dir, weighting, price, png):
+    """
+    EDA Gallery charts 1-4 plus their summary tables.
+    """
+    companies_df, stocks_df = _shared['companies'], _shared['stocks']
+    os.makedirs(out_dir, exist_ok=True)
+    t0 = time.perf_counter()
+
+    prices = build_price_matrix(stocks_df, 'Close')
+    total_return = build_price_matrix(stocks_df, 'Adj Close')
+    exchange_levels = build_indices(prices, total_return, companies_df, 'Exchange', weighting)
+    exchange_index = named_exchanges(exchange_levels)
+    sector_index = build_indices(prices, total_return, companies_df, 'Sector', weighting)
+    base_date = prices.index[0].date()
+    volatility_df = calculate_volatility(stocks_df, companies_df, price)
+    revenue_stats, revenue_outliers = revenue_growth_box_stats(revenue_growth(companies_df))
+    return_stats, return_outliers = return_box_stats(total_return, companies_df)
+
+    files = []
+    files += write_figure(figures.index_lines(
+        exchange_index, f'{WEIGHTINGS[weighting]} Total-Return Index: NYSE vs NASDAQ', base_date,
+        color_discrete_map=figures.EXCHANGE_COLORS
+    ), out_dir, 'exchange_index', png)
+    files += write_figure(figures.index_lines(
+        sector_index, f'{WEIGHTINGS[weighting]} Total-Return Index by Sector', base_date, height=600
+    ), out_dir, 'sector_index', png)
+    files += write_figure(figures.volatility_scatter(volatility_df), out_dir, 'volatility', png)
+    files += write_figure(figures.revenue_growth_box(revenue_stats, revenue_outliers), out_dir, 'revenue_growth', png)
+    files += write_figure(figures.return_distribution_box(return_stats, return_outliers), out_dir, 'return_distribution', png)
+
+    # Summary tables: index returns over the whole period, volatility, revenue growth
+    index_returns = pd.concat([exchange_index, sector_index], axis=1)
+    (rebase(index_returns, base_date).ffill().iloc[-1] / 100 - 1).rename('Total Return').to_csv(
+        os.path.join(out_dir, 'index_returns.csv'), index_label='Index'
+    )
+    volatility_df.to_csv(os.path.join(out_dir, 'volatility.csv'), index=False)
+    revenue_growth_summary(revenue_stats).to_csv(os.path.join(out_dir, 'revenue_growth_summary.csv'))
+    return_stats.to_csv(os.path.join(out_dir, 'return_distribution.csv'))
+    files += ['index_returns.csv', 'volatility.csv', 'revenue_growth_summary.csv', 'return_distribution.csv']
+
+    return {'name': 'eda', 'files': files, 'seconds': time.perf_counter() - t0}
+
+
+def render_preset(preset, out_dir, price, png):
+    """
+    Dashboard KPIs, visualizations 1-4 and summary tables for one preset.
+    """
+    companies_df = _shared['companies']
+    os.makedirs(out_dir, exist_ok=True)
+    t0 = time.perf_counter()
+
+    start, end, sectors, exchanges, top_n = resolve_preset(preset, *_shared['date_range'])
+    filtered_stocks = filter_stocks(
+        _shared['stocks_with_info'], companies_df, start, end, sectors, exchanges, top_n
+    )
+    kpis = compute_kpis(filtered_stocks, price)
+    result = {
+        'name': preset['name'],
+        'filters': {'start_date': str(start), 'end_date': str(end), 'sectors': list(sectors),
+                    'exchanges': list(exchanges), 'top_n': top_n},
+        'kpis': kpis and {key: float(value) for key, value in kpis.items()},
+        'files': [],
+    }
+    # Visualization 4 covers the whole market, so it is drawn even if no
+    # company matches the filters; only its company table follows them
+    study = _shared['drawdown']
+    if study['episode'] is not None:
+        result['files'] += render_drawdown(study, sectors, out_dir, png)
+        result['drawdown'] = episode_label(study['episode'])
+
+    if kpis is None:
+        result['seconds'] = time.perf_counter() - t0
+        return result
+
+    correlation_matrix = sector_correlation(filtered_stocks, price)
+    volume = exchange_volume(filtered_stocks)
+    filtered_companies = companies_df[companies_df['Symbol'].isin(filtered_stocks['Symbol'].unique())]
+
+    files = result['files']
+    files += write_figure(figures.sector_correlation_heatmap(correlation_matrix), out_dir, 'sector_correlation', png)
+    files += write_figure(figures.exchange_volume_area(volume), out_dir, 'exchange_volume', png)
+    files += write_figure(figures.market_cap_treemap(filtered_companies), out_dir, 'market_cap_treemap', png)
+
+    pd.Series(result['kpis'], name='Value').to_csv(os.path.join(out_dir, 'kpis.csv'), index_label='KPI')
+    correlation_matrix.to_csv(os.path.join(out_dir, 'sector_correlation.csv'))
+    volume.groupby('Exchange')['Volume'].agg(['sum', 'mean']).rename(
+        columns={'sum': 'Total Volume', 'mean': 'Avg Daily Volume'}
+    ).to_csv(os.path.join(out_dir, 'exchange_volume.csv'))
+    filtered_companies[['Symbol', 'Shortname', 'Sector', 'Exchange', 'Marketcap', 'Revenuegrowth']].to_csv(
+        os.path.join(out_dir, 'companies.csv'), index=False
+    )
+    files += ['kpis.csv', 'sector_correlation.csv', 'exchange_volume.csv', 'companies.csv']
+
+    result['seconds'] = time.perf_counter() - t0
+    return result
+
+
+def render_drawdown(study, sectors, out_dir, png):
+    """
+    Drawdown chart, sector bars and tables of the deepest episode (Dashboard
+    visualization 4). Returns the written file names.
+    """
+    episode = study['episode']
+    symbol_stats, sector_stats = study['stats']
+
+    files = write_figure(figures.drawdown_area(drawdown(study['levels']), episode), out_dir, 'market_drawdown', png)
+    files += write_figure(figures.sector_episode_bars(sector_stats), out_dir, 'sector_drawdown', png)
+
+    companies = symbol_stats[symbol_stats['Sector'].isin(sectors)] if sectors else symbol_stats
+    sector_stats.to_csv(os.path.join(out_dir, 'drawdown_sectors.csv'))
+    companies.sort_values('Drawdown Return').to_csv(os.path.join(out_dir, 'drawdown_companies.csv'))
+    return files + ['drawdown_sectors.csv', 'drawdown_companies.csv']
+
+
+def write_index(output_dir, results):
+    """
+    index.html linking every report folder and file.
+    """
+    sections = []
+    for result in results:
+        links = ''.join(
+            f'<li><a href="{html.escape(result["name"])}/{html.escape(name)}">{html.escape(name)}</a></li>'
+            for name in result['files']
+        )
+        kpis = result.get('kpis')
+        if kpis:
+            kpi_line = f'<p>{kpis["total_companies"]:.0f} companies, average price change ' \
+                       f'{kpis["price_change"]:+.2f}%</p>'
+        else:
+            kpi_line = '<p>No data matches these filters</p>' if 'kpis' in result else ''
+        drawdown_line = f'<p>Drawdown event study: {html.escape(result["drawdown"])}</p>' \
+            if result.get('drawdown') else ''
+        sections.append(f'<h2>{html.escape(result["name"])}</h2>{kpi_line}{drawdown_line}<ul>{links}</ul>')
+
+    with open(os.path.join(output_dir, 'index.html'), 'w') as f:
+        f.write(f'<html><head><meta charset="utf-8"><title>S&amp;P 500 Report {date.today()}</title></head>'
+                f'<body><h1>S&amp;P 500 Report ({date.today()})</h1>{"".join(sections)}</body></html>')
+
+
+# ====================
+# POOL
+# ====================
+
+def _init_worker(shared):
+    # With fork this is the parent's dataset itself, not a pickled copy
+    _shared.update(shared)
+
+
+def run_jobs(jobs, processes):
+    """
+    Runs (function, args) jobs, in a process pool if processes > 1, and
+    yields results as they finish.
+    """
+    if processes <= 1:
+        for func, args in jobs:
+            yield func(*args)
+        return
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=_init_worker, initargs=(dict(_shared),)) as pool:
+        futures = [pool.submit(func, *args) for func, args in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def png_available():
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render EDA Gallery and Dashboard snapshots without Streamlit.")
+    parser.add_argument('--presets', help="JSON list of Dashboard filter presets (default: built-in presets)")
+    parser.add_argument('--output-dir', default='reports', help="Where to write the reports (default: reports)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: CPU count, 1 = no pool)")
+    parser.add_argument('--weighting', choices=sorted(WEIGHTINGS), default='cap', help="EDA index weighting")
+    parser.add_argument('--price-mode', choices=list(PRICE_MODES), default='raw',
+                        help="Prices for volatility, KPIs and sector correlation (default: raw)")
+    parser.add_argument('--drawdown-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum S&P 500 decline for the drawdown event study, which shows the deepest "
+                             f"such episode (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--png', action='store_true', help="Also write PNG images (needs kaleido)")
+    parser.add_argument('--no-eda', action='store_true', help="Skip the EDA Gallery charts")
+    args = parser.parse_args(argv)
+
+    png = args.png and png_available()
+    if args.png and not png:
+        print("⚠️  kaleido is not installed, writing HTML only")
+
+    # Load the dataset once; workers share it
+    t0 = time.perf_counter()
+    companies_df, stocks_df, index_df = load_sp500_data()
+    min_date, max_date, all_sectors, _ = filter_options(stocks_df, companies_df)
+    _shared.update(
+        companies=companies_df,
+        stocks=stocks_df,
+        stocks_with_info=merge_company_info(stocks_df, companies_df),
+        date_range=(min_date, max_date),
+        drawdown=deepest_drawdown(companies_df, stocks_df, index_df, args.drawdown_threshold),
+    )
+    load_seconds = time.perf_counter() - t0
+    print(f"📦 Dataset loaded in {load_seconds:.1f} s")
+
+    if args.presets:
+        with open(args.presets) as f:
+            presets = json.load(f)
+    else:
+        presets = default_presets(all_sectors)
+
+    names = [preset['name'] for preset in presets]
+    if len(set(names)) != len(names) or 'eda' in names:
+        parser.error("preset names must be unique and not 'eda'")
+
+    price = price_column(args.price_mode)
+    jobs = [(render_preset, (preset, os.path.join(args.output_dir, preset['name']), price, png)) for preset in presets]
+    if not args.no_eda:
+        # Slowest job first so it overlaps with the presets
+        jobs.insert(0, (render_eda, (os.path.join(args.output_dir, 'eda'), args.weighting, price, png)))
+
+    print(f"🖨️  Rendering {len(presets)} preset(s) with {args.processes} process(es)...")
+    t0 = time.perf_counter()
+    results = {}
+    for result in run_jobs(jobs, args.processes):
+        results[result['name']] = result
+        print(f"  ✅ {result['name']:<32} {result['seconds']:6.2f} s  {len(result['files'])} files")
+    render_seconds = time.perf_counter() - t0
+    presets_per_minute = len(presets) / render_seconds * 60
+
+    ordered = [results[name] for name in (['eda'] if not args.no_eda else []) + names]
+    os.makedirs(args.output_dir, exist_ok=True)
+    write_index(args.output_dir, ordered)
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w') as f:
+        json.dump({
+            'generated': str(date.today()),
+            'processes': args.processes,
+            'price_mode': args.price_mode,
+            'png': png,
+            'load_seconds': load_seconds,
+            'render_seconds': render_seconds,
+            'presets_per_minute': presets_per_minute,
+            'reports': ordered,
+        }, f, indent=2)
+
+    print(f"\n⏱️  {len(presets)} preset(s) in {render_seconds:.1f} s ({presets_per_minute:.1f} presets/min)")
+    print(f"💾 Reports written to {os.path.join(args.output_dir, 'index.html')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Box-plot statistics computed server-side.
+
+px.box ships every raw value to the browser and computes quartiles there,
+which is fine for 500 revenue growth rates but not for millions of daily
+returns. Here each group is reduced to a fixed set of numbers (quartiles,
+whiskers, mean, std) plus at most a few outliers, and the figure is drawn
+from those (figures.box_from_stats), so the payload no longer grows with
+the data.
+
+Small groups (up to EXACT_LIMIT values) are computed exactly, with the same
+linear quantile interpolation and 1.5 x IQR whiskers as Plotly. Larger
+groups go through a QuantileSketch, a DDSketch-style log-bucketed histogram:
+
+  - every quantile is within RELATIVE_ACCURACY (1%) of the true value
+  - memory is a few hundred buckets however many values are added
+  - sketches merge exactly (bucket counts add up), so per-symbol or
+    per-chunk sketches can be combined into sector or market sketches
+
+Sketches also keep the most extreme values of each tail exactly, so outlier
+points and whisker ends stay exact as long as the outliers fit in them.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from load_data import get_sp500_data, get_dataset_snapshot
+from disk_cache import disk_cache
+from price_matrix import get_price_matrix, daily_returns
+from instrumentation import timed_stage
+
+EXACT_LIMIT = 10_000
+RELATIVE_ACCURACY = 0.01
+MAX_OUTLIERS = 50
+
+STAT_COLUMNS = ['Count', 'Mean', 'Std Dev', 'Min', 'Q1', 'Median', 'Q3', 'Max',
+                'Lower Fence', 'Upper Fence', 'Method']
+
+# Values closer to zero than this share one bucket (log buckets need x != 0)
+_MIN_MAGNITUDE = 1e-12
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy guarantees (DDSketch).
+
+    A value x > 0 lands in bucket ceil(log_gamma(x)) with
+    gamma = (1 + accuracy) / (1 - accuracy); negative values use a mirrored
+    set of buckets. A bucket is reported as the value whose relative error
+    to any member is at most the accuracy.
+    """
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, max_extremes=MAX_OUTLIERS):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.max_extremes = max_extremes
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.zero_count = 0
+        self.positive = (np.empty(0, np.int64), np.empty(0, np.int64))
+        self.negative = (np.empty(0, np.int64), np.empty(0, np.int64))
+        # Exact tails: (values, labels) of the smallest and largest values seen
+        self.low = (np.empty(0), np.empty(0, object))
+        self.high = (np.empty(0), np.empty(0, object))
+
+    @staticmethod
+    def _merge_buckets(buckets, keys, counts):
+        keys = np.concatenate([buckets[0], keys])
+        counts = np.concatenate([buckets[1], counts])
+        unique, inverse = np.unique(keys, return_inverse=True)
+        return unique, np.bincount(inverse, weights=counts, minlength=len(unique)).astype(np.int64)
+
+    def _keep_extremes(self, tail, values, labels, largest):
+        values = np.concatenate([tail[0], values])
+        labels = np.concatenate([tail[1], labels])
+        if len(values) > self.max_extremes:
+            order = -values if largest else values
+            keep = np.argpartition(order, self.max_extremes - 1)[:self.max_extremes]
+            values, labels = values[keep], labels[keep]
+        return values, labels
+
+    def add(self, values, labels=None):
+        """
+        Adds an array of values (NaNs are ignored). labels, if given, is a
+        parallel array naming each value (e.g. 'AAPL 2020-03-16'); only the
+        labels of the kept extremes are ever copied.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        positions = np.flatnonzero(~np.isnan(values))
+        values = values[positions]
+        if len(values) == 0:
+            return self
+
+        self.count += len(values)
+        self.total += values.sum()
+        self.total_squares += np.square(values).sum()
+
+        magnitude = np.abs(values)
+        nonzero = magnitude > _MIN_MAGNITUDE
+        self.zero_count += int((~nonzero).sum())
+        keys = np.ceil(np.log(magnitude[nonzero]) / np.log(self.gamma)).astype(np.int64)
+        positive = values[nonzero] > 0
+        for side, mask in (('positive', positive), ('negative', ~positive)):
+            unique, counts = np.unique(keys[mask], return_counts=True)
+            setattr(self, side, self._merge_buckets(getattr(self, side), unique, counts))
+
+        for tail, largest in (('low', False), ('high', True)):
+            candidates = np.arange(len(values))
+            if len(values) > self.max_extremes:
+                candidates = np.argpartition(-values if largest else values, self.max_extremes - 1)[:self.max_extremes]
+            tail_labels = (np.full(len(candidates), None, object) if labels is None
+                           else np.asarray(labels).ravel()[positions[candidates]].astype(object))
+            setattr(self, tail, self._keep_extremes(getattr(self, tail), values[candidates], tail_labels, largest))
+        return self
+
+    def merge(self, other):
+        """
+        Adds another sketch (same accuracy) into this one.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Can only merge sketches with the same relative accuracy")
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.zero_count += other.zero_count
+        self.positive = self._merge_buckets(self.positive, *other.positive)
+        self.negative = self._merge_buckets(self.negative, *other.negative)
+        self.low = self._keep_extremes(self.low, *other.low, largest=False)
+        self.high = self._keep_extremes(self.high, *other.high, largest=True)
+        return self
+
+    @property
+    def min(self):
+        return self.low[0].min() if self.count else np.nan
+
+    @property
+    def max(self):
+        return self.high[0].max() if self.count else np.nan
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        """
+        Sample standard deviation (ddof=1, like pandas).
+        """
+        if self.count < 2:
+            return np.nan
+        variance = (self.total_squares - self.total ** 2 / self.count) / (self.count - 1)
+        return np.sqrt(max(variance, 0.0))
+
+    def quantile(self, q):
+        """
+        Approximate quantile(s) q in [0, 1], clipped to the exact min/max.
+        """
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+
+        # Bucket representatives in ascending order: negatives (largest
+        # magnitude first), zero, positives
+        representative = 2 * self.gamma ** np.concatenate([self.negative[0][::-1], self.positive[0]]) / (self.gamma + 1)
+        n_negative = len(self.negative[0])
+        representative[:n_negative] *= -1
+        representative = np.insert(representative, n_negative, 0.0)
+        counts = np.concatenate([self.negative[1][::-1], [self.zero_count], self.positive[1]])
+
+        ranks = np.asarray(q, dtype=np.float64) * (self.count - 1)
+        bucket = np.searchsorted(np.cumsum(counts), ranks, side='right')
+        result = np.clip(representative[np.minimum(bucket, len(counts) - 1)], self.min, self.max)
+        return result if np.ndim(q) else float(result)
+
+
+def _fences(q1, q3):
+    iqr = q3 - q1
+    return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+
+def exact_box_stats(df, group, value, label_columns=()):
+    """
+    Exact statistics per group of df[value], plus the outliers beyond the
+    1.5 x IQR fences (group, value and the label columns joined as 'Label').
+    """
+    grouped = df.groupby(group)[value]
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats = pd.DataFrame({
+        'Count': grouped.count(),
+        'Mean': grouped.mean(),
+        'Std Dev': grouped.std(),
+        'Min': grouped.min(),
+        'Q1': quartiles[0.25],
+        'Median': quartiles[0.5],
+        'Q3': quartiles[0.75],
+        'Max': grouped.max(),
+    })
+
+    # Whiskers end at the most extreme values inside the fences
+    low, high = _fences(stats['Q1'], stats['Q3'])
+    values = df[value]
+    inside = values.between(df[group].map(low), df[group].map(high))
+    stats['Lower Fence'] = values[inside].groupby(df[group][inside]).min()
+    stats['Upper Fence'] = values[inside].groupby(df[group][inside]).max()
+    stats['Method'] = 'exact'
+
+    outliers = df.loc[~inside & values.notna()]
+    labels = outliers[list(label_columns)].astype(str).agg(' '.join, axis=1) if label_columns else None
+    outliers = pd.DataFrame({group: outliers[group], value: outliers[value], 'Label': labels})
+    return stats, outliers.reset_index(drop=True)
+
+
+def sketch_box_stats(sketches, group, value, max_outliers=MAX_OUTLIERS):
+    """
+    Approximate statistics from a {group: QuantileSketch} dict, plus the
+    (at most max_outliers per tail) exact outliers the sketches kept.
+    """
+    rows, outliers = {}, []
+    for name, sketch in sketches.items():
+        q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+        low, high = _fences(q1, q3)
+
+        low_values, low_labels = sketch.low
+        high_values, high_labels = sketch.high
+        # Exact whisker end if a kept extreme lies inside the fence, else the fence itself
+        inside_low = low_values[low_values >= low]
+        inside_high = high_values[high_values <= high]
+        rows[name] = {
+            'Count': sketch.count, 'Mean': sketch.mean, 'Std Dev': sketch.std, 'Min': sketch.min,
+            'Q1': q1, 'Median': median, 'Q3': q3, 'Max': sketch.max,
+            'Lower Fence': inside_low.min() if len(inside_low) else max(low, sketch.min),
+            'Upper Fence': inside_high.max() if len(inside_high) else min(high, sketch.max),
+            'Method': 'sketch',
+        }
+        for values, labels, beyond in ((low_values, low_labels, low_values < low),
+                                       (high_values, high_labels, high_values > high)):
+            if beyond.any():
+                order = np.argsort(-np.abs(values[beyond]))[:max_outliers]
+                outliers.append(pd.DataFrame({group: name, value: values[beyond][order], 'Label': labels[beyond][order]}))
+
+    stats = pd.DataFrame.from_dict(rows, orient='index', columns=STAT_COLUMNS).rename_axis(group)
+    outliers = pd.concat(outliers, ignore_index=True) if outliers else pd.DataFrame(columns=[group, value, 'Label'])
+    return stats, outliers
+
+
+def grouped_sketches(values, groups, labels=None, relative_accuracy=RELATIVE_ACCURACY):
+    """
+    One QuantileSketch per distinct group for parallel arrays of values and
+    group names (and optional labels).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = pd.Categorical(groups)
+    sketches = {}
+    for code, name in enumerate(groups.categories):
+        mask = groups.codes == code
+        sketches[name] = QuantileSketch(relative_accuracy).add(
+            values[mask], None if labels is None else np.asarray(labels, object)[mask]
+        )
+    return sketches
+
+
+def box_stats(df, group, value, label_columns=(), exact_limit=EXACT_LIMIT):
+    """
+    Box statistics per group: exact for groups of up to exact_limit values,
+    sketched above. Returns (stats, outliers); stats has STAT_COLUMNS,
+    outliers one row per outlier with the group, value and a 'Label' made
+    of the label columns.
+    """
+    df = df[df[value].notna()]
+    sizes = df[group].value_counts()
+    small = df[group].isin(sizes.index[sizes <= exact_limit])
+
+    parts, outliers = [], []
+    if small.any():
+        stats, exact_outliers = exact_box_stats(df[small], group, value, label_columns)
+        parts.append(stats)
+        outliers.append(exact_outliers)
+
+    large = df[~small]
+    if not large.empty:
+        labels = large[list(label_columns)].astype(str).agg(' '.join, axis=1) if label_columns else None
+        stats, sketch_outliers = sketch_box_stats(grouped_sketches(large[value], large[group], labels), group, value)
+        parts.append(stats)
+        outliers.append(sketch_outliers)
+
+    if not parts:
+        return pd.DataFrame(columns=STAT_COLUMNS).rename_axis(group), pd.DataFrame(columns=[group, value, 'Label'])
+    stats = pd.concat(parts)[STAT_COLUMNS].sort_index().rename_axis(group)
+    outliers = [frame for frame in outliers if not frame.empty]
+    outliers = pd.concat(outliers, ignore_index=True) if outliers else pd.DataFrame(columns=[group, value, 'Label'])
+    return stats, outliers
+
+
+def return_box_stats(prices, companies_df, relative_accuracy=RELATIVE_ACCURACY):
+    """
+    Distribution of every daily return by sector (millions of values),
+    sketched per sector without building a long table. Outliers are
+    labelled 'SYMBOL YYYY-MM-DD'.
+    """
+    returns = daily_returns(prices).to_numpy()
+    sectors = companies_df.drop_duplicates('Symbol').set_index('Symbol')['Sector'].reindex(prices.columns)
+    dates = prices.index.strftime('%Y-%m-%d').to_numpy()
+
+    # Labels are flat positions into the matrix until the outliers are known
+    positions = np.arange(returns.size).reshape(returns.shape)
+    sketches = {}
+    for sector in sorted(sectors.dropna().unique()):
+        columns = np.flatnonzero((sectors == sector).to_numpy())
+        sketches[sector] = QuantileSketch(relative_accuracy).add(returns[:, columns], positions[:, columns])
+
+    stats, outliers = sketch_box_stats(sketches, 'Sector', 'Return')
+    rows, columns = np.divmod(outliers['Label'].to_numpy(dtype=np.int64), returns.shape[1])
+    outliers['Label'] = prices.columns[columns] + ' ' + dates[rows]
+    return stats, outliers
+
+
+@st.cache_data(ttl=86400)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_return_box_stats():
+    """
+    Cached daily return box statistics by sector, from 'Adj Close'.
+    """
+    companies_df, _, _ = get_sp500_data()
+    prices = get_price_matrix('Adj Close')
+    with timed_stage("box_stats.returns", rows=prices.size):
+        return return_box_stats(prices, companies_df)
@@ -0,0 +1,189 @@
+"""
+Group the universe by how stocks actually trade, not by their stated sector.
+
+Both methods start from the symbol x symbol return correlation matrix of a
+lookback window (SimilarityIndex.correlation(), one float32 matmul), never
+from the raw stock rows:
+
+  - hierarchical: agglomerative clustering on the correlation distance
+    sqrt(2 * (1 - corr)), cut at n_clusters. Linkage updates use the
+    Lance-Williams formulas on the distance matrix in place. The default is
+    Ward linkage: the correlation distance is the Euclidean distance between
+    normalized return vectors, so Ward applies directly and avoids the one
+    giant cluster that average/single linkage tend to chain into.
+  - kmeans: k-means (k-means++ init, several restarts) on each symbol's
+    loadings on the leading eigenvectors of the correlation matrix, i.e.
+    its exposure to the main return factors.
+
+Plain NumPy, since neither scipy nor scikit-learn is a dependency. For ~500
+symbols either method takes well under a second, so clusters can be
+recomputed interactively when the window changes.
+
+Works without Streamlit:
+
+    from similarity import SimilarityIndex
+    from clustering import cluster_symbols
+    index = SimilarityIndex.from_prices(prices, lookback_days=252)
+    labels = cluster_symbols(index.symbols, index.correlation(), 'hierarchical', 8)
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from load_data import get_dataset_snapshot
+from disk_cache import disk_cache
+from similarity import get_similarity_index
+from instrumentation import timed_stage
+
+METHODS = {'hierarchical': 'Hierarchical (correlation distance)', 'kmeans': 'K-means (return factors)'}
+
+LINKAGES = ('ward', 'average', 'complete', 'single')
+
+# Eigenvectors of the correlation matrix used as k-means features
+N_FACTORS = 10
+
+
+def correlation_distance(corr):
+    """
+    Metric distance between return series: 0 for identical, 2 for opposite.
+    """
+    return np.sqrt(np.clip(2 * (1 - np.asarray(corr, dtype=np.float64)), 0, None))
+
+
+def _relabel_by_size(labels):
+    """
+    Renumbers cluster ids 0..k-1 from the largest cluster to the smallest.
+    """
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inverse]
+
+
+def hierarchical_clusters(corr, n_clusters=8, linkage='ward'):
+    """
+    Agglomerative clustering on correlation distance, stopped at n_clusters.
+    Returns one cluster id per row of corr (0 = largest cluster).
+    """
+    if linkage not in LINKAGES:
+        raise ValueError(f"Unknown linkage '{linkage}', expected one of {list(LINKAGES)}")
+
+    dist = correlation_distance(corr)
+    if linkage == 'ward':
+        # Ward's update works on squared distances
+        dist **= 2
+    n = len(dist)
+    np.fill_diagonal(dist, np.inf)
+    sizes = np.ones(n)
+    labels = np.arange(n)
+
+    for _ in range(n - max(1, min(n_clusters, n))):
+        a, b = divmod(int(np.argmin(dist)), n)
+        if a > b:
+            a, b = b, a
+
+        if linkage == 'ward':
+            merged = (
+                (sizes[a] + sizes) * dist[a] + (sizes[b] + sizes) * dist[b] - sizes * dist[a, b]
+            ) / (sizes[a] + sizes[b] + sizes)
+        elif linkage == 'average':
+            merged = (sizes[a] * dist[a] + sizes[b] * dist[b]) / (sizes[a] + sizes[b])
+        elif linkage == 'complete':
+            merged = np.maximum(dist[a], dist[b])
+        else:
+            merged = np.minimum(dist[a], dist[b])
+
+        # Cluster a absorbs b; b's row and column are retired
+        dist[a, :] = merged
+        dist[:, a] = merged
+        dist[a, a] = np.inf
+        dist[b, :] = np.inf
+        dist[:, b] = np.inf
+        sizes[a] += sizes[b]
+        labels[labels == b] = a
+
+    return _relabel_by_size(labels)
+
+
+def factor_features(corr, n_factors=N_FACTORS):
+    """
+    Each symbol's loadings on the leading eigenvectors of the correlation
+    matrix (eigenvector x sqrt(eigenvalue)), one row per symbol.
+    """
+    values, vectors = np.linalg.eigh(np.asarray(corr, dtype=np.float64))
+    top = slice(-min(n_factors, len(values)), None)
+    return vectors[:, top] * np.sqrt(np.clip(values[top], 0, None))
+
+
+def kmeans(features, n_clusters=8, n_init=4, max_iter=100, seed=0):
+    """
+    Lloyd's k-means with k-means++ initialization; keeps the restart with
+    the lowest inertia. Returns one cluster id per row (0 = largest).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(features)
+    k = max(1, min(n_clusters, n))
+    squared_norms = (features ** 2).sum(axis=1)
+    best_labels, best_inertia = None, np.inf
+
+    def squared_distances(centers):
+        return np.maximum(
+            squared_norms[:, None] - 2 * features @ centers.T + (centers ** 2).sum(axis=1), 0
+        )
+
+    for _ in range(n_init):
+        # k-means++: each new center is drawn proportional to squared distance
+        centers = features[[rng.integers(n)]]
+        for _ in range(1, k):
+            closest = squared_distances(centers).min(axis=1)
+            total = closest.sum()
+            probabilities = closest / total if total > 0 else None
+            centers = np.vstack([centers, features[rng.choice(n, p=probabilities)]])
+
+        labels = None
+        for _ in range(max_iter):
+            new_labels = squared_distances(centers).argmin(axis=1)
+            if labels is not None and np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+            counts = np.bincount(labels, minlength=k)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, features)
+            # Empty clusters keep their previous center
+            centers = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+
+        inertia = squared_distances(centers)[np.arange(n), labels].sum()
+        if inertia < best_inertia:
+            best_labels, best_inertia = labels, inertia
+
+    return _relabel_by_size(best_labels)
+
+
+def cluster_symbols(symbols, corr, method='hierarchical', n_clusters=8):
+    """
+    Cluster label per symbol ('Cluster 1' = largest) as a Series indexed by Symbol.
+    """
+    if method == 'hierarchical':
+        ids = hierarchical_clusters(corr, n_clusters)
+    elif method == 'kmeans':
+        ids = kmeans(factor_features(corr), n_clusters)
+    else:
+        raise ValueError(f"Unknown method '{method}', expected one of {list(METHODS)}")
+
+    return pd.Series([f'Cluster {i + 1}' for i in ids], index=pd.Index(symbols, name='Symbol'), name='Cluster')
+
+
+@st.cache_data(ttl=86400, max_entries=32)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_clusters(lookback_days=252, method='hierarchical', n_clusters=8, mode='raw'):
+    """
+    Cluster assignments for one lookback window, setting and price mode
+    (see price_modes.py), reusing the cached similarity index of that window
+    for the correlation matrix.
+    """
+    index = get_similarity_index(lookback_days, 'correlation', mode)
+    with timed_stage(f"clustering.{method}") as stage:
+        labels = cluster_symbols(index.symbols, index.correlation(), method, n_clusters)
+        stage.rows = len(labels)
+    return labels
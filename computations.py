@@ -0,0 +1,259 @@
+"""
+Data preparation shared by the EDA Gallery and Dashboard pages.
+
+The plain functions take DataFrames and work outside Streamlit. The get_*
+versions read the cached dataset themselves and are cached by small
+arguments only (dates, sector tuples, ...), so a rerun never has to hash the
+full stocks table to look up a result.
+"""
+
+import pandas as pd
+import streamlit as st
+from load_data import get_sp500_data, get_dataset_snapshot
+from disk_cache import disk_cache
+from box_stats import box_stats
+from price_modes import price_column
+
+# Readable names for the two main exchanges
+EXCHANGE_NAMES = {'NYQ': 'NYSE', 'NMS': 'NASDAQ'}
+
+
+# ====================
+# EDA GALLERY
+# ====================
+
+def named_exchanges(levels):
+    """
+    The NYSE/NASDAQ columns of exchange index levels, renamed for display.
+    An exchange without constituents in the release is simply left out.
+    """
+    present = [code for code in EXCHANGE_NAMES if code in levels.columns]
+    return levels[present].rename(columns=EXCHANGE_NAMES)
+
+
+def calculate_volatility(stocks_df, companies_df, price='Close'):
+    """
+    Optimized volatility calculation using vectorized operations (EDA Chart 3),
+    from any price column (see price_modes.py).
+    """
+    # Sort by symbol and date
+    stocks_sorted = stocks_df.sort_values(['Symbol', 'Date']).copy()
+
+    # Calculate returns for all stocks at once (vectorized)
+    stocks_sorted['Returns'] = stocks_sorted.groupby('Symbol')[price].pct_change(fill_method=None)
+
+    # Calculate volatility (std of returns) for each symbol
+    volatility_series = stocks_sorted.groupby('Symbol')['Returns'].std()
+
+    # Create dataframe with volatility
+    volatility_df = volatility_series.reset_index()
+    volatility_df.columns = ['Symbol', 'Volatility']
+
+    # Merge with company data
+    volatility_df = volatility_df.merge(
+        companies_df[['Symbol', 'Marketcap', 'Sector', 'Shortname']],
+        on='Symbol',
+        how='left'
+    )
+
+    # Remove missing values
+    volatility_df = volatility_df.dropna()
+
+    return volatility_df
+
+
+def revenue_growth(companies_df):
+    """
+    Companies with a known revenue growth rate (EDA Chart 4).
+    """
+    return companies_df[['Sector', 'Revenuegrowth', 'Symbol', 'Shortname']].dropna()
+
+
+def revenue_growth_box_stats(revenue_df):
+    """
+    Box statistics (quartiles, whiskers, outliers) per sector, so Chart 4
+    draws from a few numbers per sector instead of every company.
+    """
+    return box_stats(revenue_df, 'Sector', 'Revenuegrowth', label_columns=['Symbol', 'Shortname'])
+
+
+def revenue_growth_summary(stats):
+    """
+    Revenue growth statistics per sector from the box statistics, sorted by median.
+    """
+    summary_stats = stats[['Median', 'Mean', 'Std Dev', 'Min', 'Max']].astype(float).round(4)
+    return summary_stats.sort_values('Median', ascending=False)
+
+
+@st.cache_data(ttl=86400)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_volatility(mode='raw'):
+    companies_df, stocks_df, _ = get_sp500_data()
+    return calculate_volatility(stocks_df, companies_df, price_column(mode))
+
+
+@st.cache_data(ttl=86400)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_revenue_growth():
+    companies_df, _, _ = get_sp500_data()
+    stats, outliers = revenue_growth_box_stats(revenue_growth(companies_df))
+    return stats, outliers, revenue_growth_summary(stats)
+
+
+# ====================
+# DASHBOARD
+# ====================
+
+def filter_options(stocks_df, companies_df):
+    """
+    Date bounds plus the sorted sector and exchange lists for the sidebar.
+    """
+    min_date = stocks_df['Date'].min().date()
+    max_date = stocks_df['Date'].max().date()
+    all_sectors = sorted(companies_df['Sector'].dropna().unique())
+    all_exchanges = sorted(companies_df['Exchange'].dropna().unique())
+    return min_date, max_date, all_sectors, all_exchanges
+
+
+def merge_company_info(stocks_df, companies_df):
+    """
+    Adds Sector, Exchange and Shortname to every stock row.
+    """
+    return stocks_df.merge(
+        companies_df[['Symbol', 'Sector', 'Exchange', 'Shortname']],
+        on='Symbol',
+        how='left'
+    )
+
+
+def filter_stocks(stocks_with_info, companies_df, start_date, end_date, sectors, exchanges, top_n):
+    """
+    Applies the Dashboard sidebar filters. Empty sector/exchange selections
+    mean "no filter". Sector, exchange and market cap are company attributes,
+    so they are resolved on the small companies table first and the large
+    table is filtered once by symbol and date.
+    """
+    # Filter by top N market cap companies
+    top_companies = companies_df.nlargest(top_n, 'Marketcap')
+
+    if sectors:
+        top_companies = top_companies[top_companies['Sector'].isin(sectors)]
+
+    if exchanges:
+        top_companies = top_companies[top_companies['Exchange'].isin(exchanges)]
+
+    mask = (
+        (stocks_with_info['Date'] >= pd.to_datetime(start_date)) &
+        (stocks_with_info['Date'] <= pd.to_datetime(end_date)) &
+        stocks_with_info['Symbol'].isin(top_companies['Symbol'])
+    )
+
+    return stocks_with_info[mask]
+
+
+def compute_kpis(filtered_stocks, price='Close'):
+    """
+    Headline metrics for the filtered data, or None if nothing matches.
+    Price change is (last - first) / first per symbol in row order, 0 for
+    symbols with a single row, averaged across symbols.
+    """
+    if len(filtered_stocks) == 0:
+        return None
+
+    closes = filtered_stocks[['Symbol', price]]
+    first = closes.drop_duplicates('Symbol', keep='first').set_index('Symbol')[price]
+    last = closes.drop_duplicates('Symbol', keep='last').set_index('Symbol')[price]
+    rows = closes['Symbol'].value_counts().reindex(first.index)
+    change = ((last - first) / first * 100).where(rows > 1, 0)
+
+    return {
+        'total_companies': len(first),
+        'avg_price': filtered_stocks[price].mean(),
+        'total_volume': filtered_stocks['Volume'].sum(),
+        'price_change': change.mean(),
+    }
+
+
+def sector_correlation(filtered_stocks, price='Close'):
+    """
+    Correlation between the daily average price of each sector.
+    """
+    # Create pivot table of daily average prices by sector
+    sector_pivot = filtered_stocks.pivot_table(
+        values=price,
+        index='Date',
+        columns='Sector',
+        aggfunc='mean'
+    )
+
+    # Calculate correlation matrix
+    return sector_pivot.corr()
+
+
+def exchange_volume(filtered_stocks):
+    """
+    Total traded volume per date and exchange, with readable exchange names.
+    """
+    volume = filtered_stocks.groupby(['Date', 'Exchange'])['Volume'].sum().reset_index()
+    volume['Exchange'] = volume['Exchange'].map(EXCHANGE_NAMES).fillna(volume['Exchange'])
+    return volume
+
+
+@st.cache_data(ttl=86400)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_filter_options():
+    companies_df, stocks_df, _ = get_sp500_data()
+    return filter_options(stocks_df, companies_df)
+
+
+@st.cache_resource(ttl=86400)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_stocks_with_info():
+    """
+    Merged stocks table, shared (not copied) between sessions. Treat as read-only.
+    """
+    companies_df, stocks_df, _ = get_sp500_data()
+    return merge_company_info(stocks_df, companies_df)
+
+
+@st.cache_resource(ttl=86400, max_entries=16)
+def get_filtered_stocks(start_date, end_date, sectors, exchanges, top_n):
+    """
+    Filtered view for one combination of sidebar filters. Shared between
+    sessions and sections; treat as read-only.
+    """
+    companies_df, _, _ = get_sp500_data()
+    return filter_stocks(get_stocks_with_info(), companies_df, start_date, end_date, sectors, exchanges, top_n)
+
+
+@st.cache_data(ttl=86400, max_entries=64)
+def get_kpis(start_date, end_date, sectors, exchanges, top_n, mode='raw'):
+    # Every price mode is a column of the shared filtered view, so a new mode
+    # reuses the filtering and only recomputes the metric
+    return compute_kpis(get_filtered_stocks(start_date, end_date, sectors, exchanges, top_n), price_column(mode))
+
+
+@st.cache_data(ttl=86400, max_entries=64)
+def get_sector_correlation(start_date, end_date, sectors, exchanges, top_n, mode='raw'):
+    return sector_correlation(get_filtered_stocks(start_date, end_date, sectors, exchanges, top_n), price_column(mode))
+
+
+@st.cache_data(ttl=86400, max_entries=64)
+def get_exchange_volume(start_date, end_date, sectors, exchanges, top_n):
+    return exchange_volume(get_filtered_stocks(start_date, end_date, sectors, exchanges, top_n))
+
+
+@st.cache_data(ttl=86400, max_entries=64)
+def get_filtered_symbols(start_date, end_date, sectors, exchanges, top_n):
+    filtered_stocks = get_filtered_stocks(start_date, end_date, sectors, exchanges, top_n)
+    return tuple(sorted(filtered_stocks['Symbol'].unique()))
+
+
+@st.cache_data(ttl=86400, max_entries=64)
+def get_companies(symbols):
+    """
+    Company rows for a tuple of symbols (the treemap only depends on which
+    companies survive the filters, not on the date range itself).
+    """
+    companies_df, _, _ = get_sp500_data()
+    return companies_df[companies_df['Symbol'].isin(symbols)]
@@ -0,0 +1,98 @@
+"""
+Data-quality validation for the raw Kaggle CSVs, run once at ingest.
+
+Every check is a vectorized mask over the full table, so validating the
+~1.9M stock rows costs a fraction of a second. Rows that would silently
+corrupt a groupby or a return calculation are removed here, once, instead of
+being re-filtered (or dropna()'d) by each page on every rerun:
+
+  stocks
+    - rows without a Close price (the CSV has one row per symbol per date,
+      even before a company listed)
+    - non-positive prices (break returns and log scales)
+    - duplicate (Symbol, Date) rows (the last one is kept)
+    - symbols missing from companies (left merges would give them NaN Sector/Exchange)
+    - zero-volume days (stale quotes carried over from the previous close)
+  companies
+    - duplicate symbols (the first row is kept)
+    - missing Sector / Exchange (reported only)
+  index
+    - missing S&P500 values and duplicate dates
+
+`validate_sp500_data` returns the cleaned tables plus two small tables: the
+quality report (one row per check) and per-symbol first/last valid dates.
+"""
+
+import pandas as pd
+
+PRICE_COLUMNS = ['Adj Close', 'Close', 'High', 'Low', 'Open']
+
+
+def _check(report, table, check, count, action):
+    report.append({'Table': table, 'Check': check, 'Rows': int(count), 'Action': action})
+
+
+def validate_companies(companies_df, report):
+    duplicated = companies_df['Symbol'].duplicated(keep='first')
+    _check(report, 'companies', 'Duplicate symbol', duplicated.sum(), 'Kept first row')
+    companies_df = companies_df[~duplicated]
+
+    for column in ['Sector', 'Exchange']:
+        _check(report, 'companies', f'Missing {column}', companies_df[column].isna().sum(), 'Reported')
+
+    return companies_df.reset_index(drop=True)
+
+
+def validate_stocks(stocks_df, known_symbols, report):
+    prices = [column for column in PRICE_COLUMNS if column in stocks_df.columns]
+
+    missing_close = stocks_df['Close'].isna()
+    non_positive = (stocks_df[prices] <= 0).any(axis=1)
+    duplicated = stocks_df.duplicated(['Symbol', 'Date'], keep='last')
+    unknown_symbol = ~stocks_df['Symbol'].isin(known_symbols)
+    zero_volume = stocks_df['Volume'].eq(0) & ~missing_close
+    partial_prices = stocks_df[prices].isna().any(axis=1) & ~missing_close
+
+    _check(report, 'stocks', 'Missing Close price', missing_close.sum(), 'Dropped')
+    _check(report, 'stocks', 'Non-positive price', non_positive.sum(), 'Dropped')
+    _check(report, 'stocks', 'Duplicate (Symbol, Date)', duplicated.sum(), 'Kept last row')
+    _check(report, 'stocks', 'Symbol not in companies', unknown_symbol.sum(), 'Dropped')
+    _check(report, 'stocks', 'Zero-volume day', zero_volume.sum(), 'Dropped')
+    _check(report, 'stocks', 'Other price column missing', partial_prices.sum(), 'Reported')
+
+    bad = missing_close | non_positive | duplicated | unknown_symbol | zero_volume
+    return stocks_df[~bad].reset_index(drop=True)
+
+
+def validate_index(index_df, report):
+    missing = index_df['S&P500'].isna()
+    duplicated = index_df.duplicated('Date', keep='last')
+    _check(report, 'index', 'Missing S&P500 value', missing.sum(), 'Dropped')
+    _check(report, 'index', 'Duplicate date', duplicated.sum(), 'Kept last row')
+    return index_df[~(missing | duplicated)].sort_values('Date').reset_index(drop=True)
+
+
+def symbol_ranges(stocks_df, companies_df):
+    """
+    First/last valid trading date and number of valid days per company
+    (NaT / 0 for companies without any valid price).
+    """
+    ranges = stocks_df.groupby('Symbol')['Date'].agg(['min', 'max', 'count'])
+    ranges.columns = ['First Valid Date', 'Last Valid Date', 'Trading Days']
+    ranges = ranges.reindex(companies_df['Symbol'])
+    ranges['Trading Days'] = ranges['Trading Days'].fillna(0).astype(int)
+    return ranges
+
+
+def validate_sp500_data(companies_df, stocks_df, index_df):
+    """
+    Runs every check and returns (companies_df, stocks_df, index_df,
+    quality_report, symbol_ranges) with the bad rows removed.
+    """
+    report = []
+    companies_df = validate_companies(companies_df, report)
+    stocks_df = validate_stocks(stocks_df, companies_df['Symbol'], report)
+    index_df = validate_index(index_df, report)
+
+    quality_report = pd.DataFrame(report, columns=['Table', 'Check', 'Rows', 'Action'])
+    return companies_df, stocks_df, index_df, quality_report, symbol_ranges(stocks_df, companies_df)
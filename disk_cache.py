@@ -0,0 +1,377 @@
+"""
+Persistent on-disk cache for derived results, so a restarted app serves warm
+results instead of recomputing merges, pivots and volatility for its first users.
+
+Opt in by putting @disk_cache() under the Streamlit cache decorator:
+
+    @st.cache_data(ttl=86400)
+    @disk_cache(snapshot=get_dataset_snapshot)
+    def get_volatility():
+        ...
+
+A miss in process memory then falls through to disk before recomputing.
+Entries are keyed by (function, code, dataset snapshot, arguments), where
+code is the source of the function's module and of every project module it
+imports, directly or through others. A new Kaggle release, or an edit to the
+function or to any helper it calls, therefore never serves stale results.
+
+Each entry is a directory holding a JSON manifest plus one payload file per
+DataFrame/Series (Arrow IPC, lz4-compressed) or ndarray (.npy); tuples,
+dicts, dates and scalars are encoded in the manifest itself. The manifest
+records every file's size and SHA-256, which are checked on read; a
+damaged entry is deleted and recomputed. Entries are written to a temp
+directory and renamed into place, so readers never see half-written data.
+When the cache grows past its size limit, least-recently-used entries are
+evicted (hits refresh an entry's modification time).
+
+Results of unsupported types (arbitrary objects) are simply not persisted.
+
+Environment:
+    SP500_CACHE_DIR     cache location (default: .sp500_cache next to this file)
+    SP500_CACHE_MAX_MB  size limit in MB (default: 2048)
+    SP500_DISK_CACHE=0  disables the disk cache
+"""
+
+import datetime
+import functools
+import hashlib
+import inspect
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from instrumentation import timed_stage
+
+logger = logging.getLogger("sp500.disk_cache")
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+_MISSING = object()
+
+# Modules in this folder count as project code for cache keys
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnsupportedPayload(TypeError):
+    pass
+
+
+def cache_dir():
+    return os.environ.get("SP500_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sp500_cache")
+
+
+def max_bytes():
+    return int(float(os.environ.get("SP500_CACHE_MAX_MB", 2048)) * 1024 * 1024)
+
+
+def enabled():
+    return os.environ.get("SP500_DISK_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(function_name, code_hash, snapshot, args, kwargs):
+    """
+    Stable entry key. Arguments are keyed by their repr, which is exact for
+    the small values (dates, strings, tuples, numbers) cached functions take.
+    """
+    raw = repr((FORMAT_VERSION, function_name, code_hash, snapshot, args, sorted(kwargs.items())))
+    return _sha256(raw.encode())
+
+
+def _project_module(obj):
+    """
+    The project module obj is (or was defined in), or None for anything
+    from the standard library or site-packages.
+    """
+    if inspect.ismodule(obj):
+        module = obj
+    else:
+        try:
+            name = getattr(obj, '__module__', None)
+        except Exception:
+            return None
+        module = sys.modules.get(name) if isinstance(name, str) else None
+    path = getattr(module, '__file__', None)
+    if path and os.path.dirname(os.path.abspath(path)) == PROJECT_DIR:
+        return module
+    return None
+
+
+def code_hash(func):
+    """
+    Hash of the source of func's module and of every project module reachable
+    from it through imported modules, functions and classes.
+    """
+    modules = {}
+    pending = [_project_module(func)]
+    while pending:
+        module = pending.pop()
+        if module is None or module.__name__ in modules:
+            continue
+        modules[module.__name__] = module
+        pending.extend(_project_module(value) for value in list(vars(module).values()))
+
+    digest = hashlib.sha256()
+    for name in sorted(modules):
+        try:
+            digest.update(inspect.getsource(modules[name]).encode())
+        except (OSError, TypeError):
+            digest.update(name.encode())
+    if not modules:
+        try:
+            digest.update(inspect.getsource(func).encode())
+        except (OSError, TypeError):
+            pass
+    return digest.hexdigest()[:16]
+
+
+# ====================
+# ENCODING
+# ====================
+
+def _arrow_bytes(frame):
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression='lz4' if pa.Codec.is_available('lz4') else None)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _encode(value, files):
+    """
+    Manifest node for value; payload bytes are appended to files.
+    """
+    if isinstance(value, pd.DataFrame):
+        name = f'{len(files)}.arrow'
+        files.append((name, _arrow_bytes(value)))
+        return {'type': 'frame', 'file': name}
+    if isinstance(value, pd.Series):
+        name = f'{len(files)}.arrow'
+        files.append((name, _arrow_bytes(value.to_frame(name='values'))))
+        return {'type': 'series', 'file': name, 'name': _encode(value.name, files)}
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            raise UnsupportedPayload("object arrays are not supported")
+        buffer = io.BytesIO()
+        np.save(buffer, value, allow_pickle=False)
+        name = f'{len(files)}.npy'
+        files.append((name, buffer.getvalue()))
+        return {'type': 'ndarray', 'file': name}
+    if isinstance(value, (tuple, list)):
+        return {'type': type(value).__name__, 'items': [_encode(item, files) for item in value]}
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            raise UnsupportedPayload("only dicts with string keys are supported")
+        return {'type': 'dict', 'items': [[key, _encode(item, files)] for key, item in value.items()]}
+    if isinstance(value, pd.Timestamp):
+        return {'type': 'timestamp', 'value': value.isoformat()}
+    if isinstance(value, datetime.datetime):
+        return {'type': 'datetime', 'value': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'type': 'date', 'value': value.isoformat()}
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        # JSON has no NaN/inf, so floats go through repr
+        if isinstance(value, float):
+            return {'type': 'float', 'value': repr(value)}
+        return {'type': 'json', 'value': value}
+    raise UnsupportedPayload(f"cannot persist {type(value).__name__}")
+
+
+def _decode(node, payloads):
+    kind = node['type']
+    if kind == 'frame':
+        return pa.ipc.open_file(pa.BufferReader(payloads[node['file']])).read_all().to_pandas()
+    if kind == 'series':
+        frame = pa.ipc.open_file(pa.BufferReader(payloads[node['file']])).read_all().to_pandas()
+        return frame['values'].rename(_decode(node['name'], payloads))
+    if kind == 'ndarray':
+        return np.load(io.BytesIO(payloads[node['file']]), allow_pickle=False)
+    if kind == 'tuple':
+        return tuple(_decode(item, payloads) for item in node['items'])
+    if kind == 'list':
+        return [_decode(item, payloads) for item in node['items']]
+    if kind == 'dict':
+        return {key: _decode(item, payloads) for key, item in node['items']}
+    if kind == 'timestamp':
+        return pd.Timestamp(node['value'])
+    if kind == 'datetime':
+        return datetime.datetime.fromisoformat(node['value'])
+    if kind == 'date':
+        return datetime.date.fromisoformat(node['value'])
+    if kind == 'float':
+        return float(node['value'])
+    return node['value']
+
+
+# ====================
+# STORAGE
+# ====================
+
+def _remove(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def load(key, function_name='', default=_MISSING):
+    """
+    Cached value for key, or default (_MISSING) if absent or damaged.
+    """
+    entry = os.path.join(cache_dir(), key)
+    manifest_path = os.path.join(entry, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return default
+
+    try:
+        with timed_stage(f"disk_cache.load.{function_name}") as stage:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            payloads = {}
+            for name, expected in manifest['files'].items():
+                with open(os.path.join(entry, name), 'rb') as f:
+                    data = f.read()
+                if len(data) != expected['size'] or _sha256(data) != expected['sha256']:
+                    raise ValueError(f"checksum mismatch in {name}")
+                payloads[name] = data
+            value = _decode(manifest['value'], payloads)
+            stage.rows = manifest['size']
+    except Exception as error:
+        logger.warning("Discarding damaged disk cache entry %s (%s): %s", key, function_name, error)
+        _remove(entry)
+        return default
+
+    # Refresh the entry's position in the LRU order
+    try:
+        os.utime(manifest_path)
+    except OSError:
+        pass
+    return value
+
+
+def store(key, value, function_name='', overwrite=False):
+    """
+    Persists value under key (atomically), then enforces the size limit.
+    An existing entry is kept unless overwrite is set (for state that is
+    updated in place rather than derived once per key).
+    Returns False if the value's type cannot be persisted.
+    """
+    root = cache_dir()
+    try:
+        with timed_stage(f"disk_cache.store.{function_name}") as stage:
+            files = []
+            node = _encode(value, files)
+            manifest = {
+                'function': function_name,
+                'created': time.time(),
+                'size': sum(len(data) for _, data in files),
+                'files': {name: {'size': len(data), 'sha256': _sha256(data)} for name, data in files},
+                'value': node,
+            }
+            stage.rows = manifest['size']
+
+            os.makedirs(root, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+            for name, data in files:
+                with open(os.path.join(staging, name), 'wb') as f:
+                    f.write(data)
+            # Manifest last: an entry without one is never read
+            with open(os.path.join(staging, MANIFEST), 'w') as f:
+                json.dump(manifest, f)
+
+            if overwrite:
+                _remove(os.path.join(root, key))
+            try:
+                os.replace(staging, os.path.join(root, key))
+            except OSError:
+                # Another process stored the same key first
+                _remove(staging)
+    except UnsupportedPayload as error:
+        logger.info("Not persisting %s: %s", function_name, error)
+        return False
+    except OSError as error:
+        logger.warning("Could not write disk cache entry for %s: %s", function_name, error)
+        return False
+
+    evict()
+    return True
+
+
+def entries():
+    """
+    (key, size in bytes, last used) for every complete entry, oldest first.
+    """
+    root = cache_dir()
+    if not os.path.isdir(root):
+        return []
+    found = []
+    for key in os.listdir(root):
+        manifest_path = os.path.join(root, key, MANIFEST)
+        try:
+            last_used = os.path.getmtime(manifest_path)
+            with open(manifest_path) as f:
+                size = json.load(f)['size']
+        except (OSError, ValueError, KeyError):
+            continue
+        found.append((key, size, last_used))
+    return sorted(found, key=lambda entry: entry[2])
+
+
+def evict(limit=None):
+    """
+    Deletes least-recently-used entries until the cache fits in limit bytes.
+    """
+    limit = max_bytes() if limit is None else limit
+    current = entries()
+    total = sum(size for _, size, _ in current)
+    for key, size, _ in current:
+        if total <= limit:
+            break
+        _remove(os.path.join(cache_dir(), key))
+        total -= size
+
+
+def clear():
+    _remove(cache_dir())
+
+
+def disk_cache(snapshot=None, name=None):
+    """
+    Decorator persisting a function's results on disk. snapshot is a
+    zero-argument callable identifying the dataset version the result was
+    derived from (e.g. load_data.get_dataset_snapshot).
+    """
+    def decorator(func):
+        function_name = name or f"{func.__module__}.{func.__qualname__}"
+        # Hashed on first call, once every module the function uses is imported
+        hashes = []
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+
+            if not hashes:
+                hashes.append(code_hash(func))
+            key = make_key(function_name, hashes[0], snapshot() if snapshot else None, args, kwargs)
+            value = load(key, function_name)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                store(key, value, function_name)
+            return value
+
+        return wrapper
+
+    return decorator
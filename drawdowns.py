@@ -0,0 +1,180 @@
+"""
+Drawdown episodes of the S&P 500 and how each stock and sector behaved in them.
+
+An episode runs from a market peak to the day the index is back at that
+peak: it starts on the last all-time high before the index fell, bottoms out
+at the trough and ends at the recovery (or is still open). Episodes deeper
+than a threshold (10% by default: corrections, bear markets) are detected in
+one pass over index_df['S&P500'] with a running maximum.
+
+For an episode, every symbol is measured at once on the price matrix window
+(no per-symbol loop):
+
+  - Drawdown Return: peak to trough
+  - Recovery Return: trough to the index recovery (or the last date)
+  - Beta: of daily returns to the index's, from peak to recovery
+  - Days to Recover: trading days after the trough until the stock is back
+    at its own peak-date price (NaN if it never got there)
+
+Sector figures are medians/means over their members. Results are cached per
+episode, so switching episodes on the Dashboard is a lookup.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from load_data import get_sp500_data, get_dataset_snapshot
+from disk_cache import disk_cache
+from price_matrix import get_price_matrix, daily_returns
+from instrumentation import timed_stage
+
+DEFAULT_THRESHOLD = 0.10
+
+# Fewer overlapping daily returns than this give no beta
+MIN_BETA_DAYS = 20
+
+
+def index_series(index_df):
+    """
+    S&P 500 level as a Date-indexed series.
+    """
+    return index_df.set_index('Date')['S&P500'].sort_index()
+
+
+def drawdown(levels):
+    """
+    Fractional distance below the running maximum (0 at every new high).
+    """
+    return levels / levels.cummax() - 1
+
+
+def drawdown_episodes(levels, threshold=DEFAULT_THRESHOLD):
+    """
+    Peak-to-recovery episodes whose depth reaches threshold, one row each
+    (deepest first): Peak, Trough, Recovery (NaT if still open), Depth,
+    Days to Trough and Days to Recover (trading days, from the trough).
+    """
+    underwater = drawdown(levels)
+    # Each run below the high shares an id with the high it fell from
+    episode_id = (underwater >= 0).cumsum()
+    frame = pd.DataFrame({'Drawdown': underwater, 'Id': episode_id.to_numpy(), 'Position': np.arange(len(levels))})
+
+    grouped = frame.groupby('Id')
+    episodes = pd.DataFrame({
+        'Peak': grouped['Drawdown'].apply(lambda dd: dd.index[0]),
+        'Trough': grouped['Drawdown'].idxmin(),
+        'Depth': grouped['Drawdown'].min(),
+        'Start': grouped['Position'].first(),
+        'Length': grouped['Position'].count(),
+    })
+    episodes = episodes[episodes['Depth'] <= -threshold]
+
+    trough_position = levels.index.get_indexer(episodes['Trough'])
+    end_position = (episodes['Start'] + episodes['Length']).to_numpy()
+    recovered = end_position < len(levels)
+    episodes['Recovery'] = pd.NaT
+    episodes.loc[recovered, 'Recovery'] = levels.index[end_position[recovered]]
+    episodes['Days to Trough'] = trough_position - episodes['Start'].to_numpy()
+    episodes['Days to Recover'] = np.where(recovered, end_position - trough_position, np.nan)
+
+    episodes = episodes.drop(columns=['Start', 'Length']).sort_values('Depth').reset_index(drop=True)
+    return episodes[['Peak', 'Trough', 'Recovery', 'Depth', 'Days to Trough', 'Days to Recover']]
+
+
+def episode_label(episode):
+    recovery = f"{episode['Recovery']:%b %Y}" if pd.notna(episode['Recovery']) else 'ongoing'
+    return f"{episode['Peak']:%b %Y} – {recovery} ({episode['Depth']:.1%})"
+
+
+def _last_prices(prices, date):
+    """
+    Each symbol's last known price on or before date.
+    """
+    return prices.loc[:date].ffill().iloc[-1]
+
+
+def symbol_episode_stats(prices, levels, peak, trough, recovery=None):
+    """
+    Drawdown Return, Recovery Return, Beta and Days to Recover for every
+    symbol (column of prices) in one episode. Symbols without a price at the
+    peak are left out.
+    """
+    end = recovery if pd.notna(recovery) else prices.index[-1]
+    at_peak = _last_prices(prices, peak)
+    prices = prices.loc[:, at_peak.notna()]
+    at_peak = at_peak[at_peak.notna()]
+    at_trough = _last_prices(prices, trough)
+
+    # Beta of daily returns over the episode, vectorized across symbols
+    window = prices.loc[peak:end]
+    returns = daily_returns(window).to_numpy()[1:]
+    market = levels.reindex(window.index).ffill().pct_change().to_numpy()[1:, None]
+    valid = ~np.isnan(returns) & ~np.isnan(market)
+    returns = np.where(valid, returns, np.nan)
+    market = np.where(valid, market, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = np.nanmean((returns - np.nanmean(returns, axis=0)) * (market - np.nanmean(market, axis=0)), axis=0)
+        beta = covariance / np.nanvar(market, axis=0)
+    beta[valid.sum(axis=0) < MIN_BETA_DAYS] = np.nan
+
+    # First trading day from the trough on at or above the peak price
+    back = prices.loc[trough:].to_numpy() >= at_peak.to_numpy()
+    days_to_recover = np.where(back.any(axis=0), back.argmax(axis=0), np.nan)
+
+    return pd.DataFrame({
+        'Drawdown Return': at_trough / at_peak - 1,
+        'Recovery Return': _last_prices(prices, end) / at_trough - 1,
+        'Beta': beta,
+        'Days to Recover': days_to_recover,
+    }).rename_axis('Symbol')
+
+
+def episode_stats(prices, levels, companies_df, episode):
+    """
+    (symbol stats with Sector and Shortname, sector stats) for one episode
+    (a row of drawdown_episodes).
+    """
+    stats = symbol_episode_stats(prices, levels, episode['Peak'], episode['Trough'], episode['Recovery'])
+    info = companies_df.drop_duplicates('Symbol').set_index('Symbol')[['Shortname', 'Sector']]
+    stats = info.join(stats, how='inner')
+    return stats, sector_episode_stats(stats)
+
+
+def sector_episode_stats(symbol_stats):
+    """
+    Per-sector summary of symbol_episode_stats output.
+    """
+    grouped = symbol_stats.groupby('Sector')
+    return pd.DataFrame({
+        'Companies': grouped.size(),
+        'Drawdown Return': grouped['Drawdown Return'].mean(),
+        'Recovery Return': grouped['Recovery Return'].mean(),
+        'Median Beta': grouped['Beta'].median(),
+        'Recovered': grouped['Days to Recover'].apply(lambda days: days.notna().mean()),
+        'Median Days to Recover': grouped['Days to Recover'].median(),
+    }).sort_values('Drawdown Return')
+
+
+@st.cache_data(ttl=86400)
+def get_index_levels():
+    _, _, index_df = get_sp500_data()
+    return index_series(index_df)
+
+
+@st.cache_data(ttl=86400, max_entries=8)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_drawdown_episodes(threshold=DEFAULT_THRESHOLD):
+    return drawdown_episodes(get_index_levels(), threshold)
+
+
+@st.cache_data(ttl=86400, max_entries=32)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_episode_stats(peak, trough, recovery):
+    """
+    Cached (symbol stats, sector stats) for one episode, keyed by its dates.
+    """
+    companies_df, _, _ = get_sp500_data()
+    prices = get_price_matrix('Adj Close')
+    episode = {'Peak': peak, 'Trough': trough, 'Recovery': recovery}
+    with timed_stage("drawdowns.episode_stats", rows=prices.size):
+        return episode_stats(prices, get_index_levels(), companies_df, episode)
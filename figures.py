@@ -0,0 +1,220 @@
+"""
+Plotly figures for the EDA Gallery and Dashboard charts.
+
+Each function takes the table a page already computed (see computations.py
+and indices.py) and returns a figure, without touching Streamlit, so the
+pages and the batch report CLI (batch_report.py) draw identical charts.
+"""
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Fixed colours so NYSE/NASDAQ look the same in every index chart
+EXCHANGE_COLORS = {'NYSE': '#1f77b4', 'NASDAQ': '#ff7f0e'}
+
+
+# ====================
+# EDA GALLERY
+# ====================
+
+def index_lines(index_df, title, base_date, height=500, color_discrete_map=None):
+    """
+    Line chart of rebased index levels (Date x Group), EDA Charts 1 and 2.
+    """
+    fig = px.line(
+        index_df,
+        title=title,
+        labels={'value': f'Index Level ({base_date} = 100)', 'Date': 'Date'},
+        color_discrete_map=color_discrete_map
+    )
+
+    fig.update_layout(hovermode='x unified', height=height)
+    return fig
+
+
+def volatility_scatter(plot_df, color='Sector', category_orders=None):
+    """
+    Market cap vs volatility scatter (EDA Chart 3), coloured by any column.
+    """
+    # No trend line - cleaner visualization
+    fig = px.scatter(
+        plot_df,
+        x='Marketcap',
+        y='Volatility',
+        color=color,
+        hover_data=['Symbol', 'Shortname', 'Sector'],
+        category_orders=category_orders,
+        title='Market Capitalization vs Stock Price Volatility',
+        labels={'Marketcap': 'Market Capitalization ($)', 'Volatility': 'Volatility (Std Dev of Returns)'},
+        log_x=True  # Log scale for better visualization
+    )
+
+    fig.update_layout(height=600, hovermode='closest')
+    return fig
+
+
+def box_from_stats(stats, outliers, title, value_label, value_format='.2f', height=600):
+    """
+    Box plot drawn from precomputed statistics (see box_stats.py): one box
+    per row of stats plus the outlier points, so the figure size does not
+    depend on how many values each box summarizes.
+    """
+    group = stats.index.name
+    value = outliers.columns[1]
+    colors = px.colors.qualitative.Plotly
+
+    fig = go.Figure()
+    for i, (name, row) in enumerate(stats.iterrows()):
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            x=[name], q1=[row['Q1']], median=[row['Median']], q3=[row['Q3']],
+            lowerfence=[row['Lower Fence']], upperfence=[row['Upper Fence']], mean=[row['Mean']],
+            name=name, marker_color=color
+        ))
+        points = outliers[outliers[group] == name]
+        if len(points):
+            fig.add_trace(go.Scatter(
+                x=[name] * len(points), y=points[value], mode='markers', marker=dict(color=color, size=5),
+                customdata=points['Label'], hovertemplate=f'%{{customdata}}: %{{y:{value_format}}}<extra></extra>',
+                name=name, showlegend=False
+            ))
+
+    fig.update_layout(title=title, xaxis_title=group, yaxis_title=value_label, height=height, showlegend=False)
+    return fig
+
+
+def revenue_growth_box(stats, outliers):
+    """
+    Revenue growth distribution per sector (EDA Chart 4).
+    """
+    fig = box_from_stats(stats, outliers, 'Revenue Growth Distribution by Sector', 'Revenue Growth Rate', '.1%')
+    fig.update_layout(xaxis_tickangle=-45)
+    fig.update_yaxes(tickformat='.0%', hoverformat='.1%')  # Format as percentage
+    return fig
+
+
+def return_distribution_box(stats, outliers):
+    """
+    Daily return distribution per sector (EDA Chart 4, second view).
+    """
+    fig = box_from_stats(stats, outliers, 'Daily Return Distribution by Sector', 'Daily Return', '.2%')
+    fig.update_layout(xaxis_tickangle=-45)
+    fig.update_yaxes(tickformat='.0%', hoverformat='.2%')
+    return fig
+
+
+# ====================
+# DASHBOARD
+# ====================
+
+def sector_correlation_heatmap(correlation_matrix):
+    """
+    Heatmap of sector correlations (Dashboard Visualization 1).
+    """
+    fig = px.imshow(
+        correlation_matrix,
+        text_auto='.2f',
+        aspect='auto',
+        title='How Do Sectors Move Together?',
+        labels={'color': 'Correlation Coefficient'},
+        color_continuous_scale='RdBu_r',
+        zmin=-1,
+        zmax=1
+    )
+
+    fig.update_layout(height=500)
+    return fig
+
+
+def exchange_volume_area(exchange_volume):
+    """
+    Stacked traded volume per exchange over time (Dashboard Visualization 2).
+    """
+    fig = px.area(
+        exchange_volume,
+        x='Date',
+        y='Volume',
+        color='Exchange',
+        title='Trading Volume Over Time by Exchange',
+        labels={'Volume': 'Total Volume', 'Date': 'Date'}
+    )
+
+    fig.update_layout(hovermode='x unified', height=500)
+    return fig
+
+
+def market_cap_treemap(companies_df, clusters=None):
+    """
+    Market cap treemap (Dashboard Visualization 3), grouped by sector, or by
+    return cluster when a Symbol -> Cluster series is given.
+    """
+    if clusters is None:
+        fig = px.treemap(
+            companies_df,
+            path=['Sector', 'Symbol'],
+            values='Marketcap',
+            color='Revenuegrowth',
+            hover_data=['Shortname', 'Marketcap'],
+            title='Market Cap Distribution by Sector and Company',
+            color_continuous_scale='RdYlGn',
+            labels={'Revenuegrowth': 'Revenue Growth (%)'}
+        )
+    else:
+        clustered = companies_df.merge(clusters.reset_index(), on='Symbol', how='left')
+        clustered['Cluster'] = clustered['Cluster'].fillna('Unclustered')
+        fig = px.treemap(
+            clustered,
+            path=['Cluster', 'Symbol'],
+            values='Marketcap',
+            color='Cluster',
+            hover_data=['Shortname', 'Sector', 'Marketcap'],
+            title='Market Cap Distribution by Return Cluster and Company'
+        )
+
+    fig.update_layout(height=500)
+    return fig
+
+
+def drawdown_area(drawdown_series, episode=None):
+    """
+    S&P 500 drawdown from its running high, with one episode shaded.
+    """
+    fig = px.area(
+        drawdown_series.rename('Drawdown').reset_index(),
+        x='Date',
+        y='Drawdown',
+        title='S&P 500 Drawdown from Previous High',
+        labels={'Drawdown': 'Below Previous High', 'Date': 'Date'}
+    )
+    fig.update_traces(line_color='#d62728')
+
+    if episode is not None:
+        end = episode['Recovery'] if pd.notna(episode['Recovery']) else drawdown_series.index[-1]
+        fig.add_vrect(x0=episode['Peak'], x1=end, fillcolor='grey', opacity=0.2, line_width=0)
+        fig.add_vline(x=episode['Trough'], line_dash='dash', line_color='grey')
+
+    fig.update_yaxes(tickformat='.0%')
+    fig.update_layout(hovermode='x unified', height=350)
+    return fig
+
+
+def sector_episode_bars(sector_stats):
+    """
+    Average drawdown and recovery return per sector for one episode.
+    """
+    fig = px.bar(
+        sector_stats.reset_index().melt(
+            id_vars='Sector', value_vars=['Drawdown Return', 'Recovery Return'], var_name='Phase', value_name='Return'
+        ),
+        x='Sector',
+        y='Return',
+        color='Phase',
+        barmode='group',
+        title='Average Stock Return by Sector: Peak to Trough and Trough to Recovery',
+        color_discrete_map={'Drawdown Return': '#d62728', 'Recovery Return': '#2ca02c'}
+    )
+
+    fig.update_yaxes(tickformat='.0%')
+    fig.update_layout(height=500, xaxis_tickangle=-45)
+    return fig
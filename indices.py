@@ -0,0 +1,248 @@
+"""
+Sector and exchange indices built from the price matrix.
+
+Instead of averaging raw closing prices (which lets a $900 stock drown out a
+$40 one), each group gets a proper index:
+
+  - cap-weighted: each day's group return is the average of member returns
+    weighted by the previous day's market cap
+  - equal-weighted: the plain average of member returns
+
+Returns come from the dividend-adjusted 'Adj Close' matrix, so the indices
+are total-return indices. Market caps through time are estimated as
+implied shares (current Marketcap / latest close) x daily close, i.e.
+share counts are assumed constant over the history.
+
+Levels are stored once, starting at 100. Rebasing to another start date is
+a single vectorized division (`rebase`). New trading days are appended
+without touching history: get_indices keeps the last levels, the share
+counts they were weighted with and a fingerprint of the history on disk
+(per data source), and when a new release arrives only the days after the
+stored last date are computed (`update_indices`). The update is only taken
+when the new release starts on the same date, has the same constituents
+and groups, and agrees with the fingerprint (per-symbol checksums of Close
+and of Adj Close returns), i.e. it merely appended days; a revised history,
+a split adjustment or a new constituent's back-history triggers a full
+rebuild. An update therefore equals a full build with the stored shares.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from load_data import get_sp500_data, get_dataset_snapshot, data_source
+from disk_cache import disk_cache, code_hash, enabled, make_key, load, store
+from price_matrix import get_price_matrix
+from instrumentation import timed_stage
+
+WEIGHTINGS = {'cap': 'Cap-weighted', 'equal': 'Equal-weighted'}
+
+
+def _membership(symbols, companies_df, by):
+    """
+    One-hot Symbol x Group matrix for a companies_df column (e.g. 'Sector').
+    Symbols with no group get an all-zero row.
+    """
+    groups = companies_df.drop_duplicates('Symbol').set_index('Symbol')[by].reindex(symbols)
+    names = sorted(groups.dropna().unique())
+    codes = pd.Categorical(groups, categories=names).codes
+    membership = np.zeros((len(symbols), len(names)))
+    members = codes >= 0
+    membership[np.flatnonzero(members), codes[members]] = 1.0
+    return names, membership
+
+
+def implied_shares(prices, companies_df):
+    """
+    Shares outstanding implied by the Marketcap snapshot and each symbol's
+    latest close in the price matrix.
+    """
+    values = prices.to_numpy()
+    valid = ~np.isnan(values)
+    last_row = values.shape[0] - 1 - valid[::-1].argmax(axis=0)
+    last_close = np.where(valid.any(axis=0), values[last_row, np.arange(values.shape[1])], np.nan)
+    marketcap = companies_df.drop_duplicates('Symbol').set_index('Symbol')['Marketcap'].reindex(prices.columns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return marketcap.to_numpy(dtype=np.float64) / last_close
+
+
+def group_returns(prices, total_return_prices, companies_df, by='Sector', weighting='cap', shares=None):
+    """
+    Daily index returns per group (dates = prices.index[1:]).
+
+    A member counts on day t only if it has a return for t and (for cap
+    weighting) a market cap for t-1, so weights renormalize automatically as
+    companies list, delist or have gaps. Days where a group has no valid
+    member are NaN.
+    """
+    names, membership = _membership(prices.columns, companies_df, by)
+    tr = total_return_prices.reindex(index=prices.index, columns=prices.columns).to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = tr[1:] / tr[:-1] - 1
+
+        if weighting == 'cap':
+            if shares is None:
+                shares = implied_shares(prices, companies_df)
+            weights = prices.to_numpy()[:-1] * shares
+        elif weighting == 'equal':
+            weights = np.ones_like(returns)
+        else:
+            raise ValueError(f"Unknown weighting '{weighting}', expected one of {list(WEIGHTINGS)}")
+
+        valid = np.isfinite(returns) & np.isfinite(weights) & (weights > 0)
+        weights = np.where(valid, weights, 0.0)
+        weighted_returns = np.where(valid, returns, 0.0) * weights
+
+        numerator = weighted_returns @ membership
+        denominator = weights @ membership
+        result = np.where(denominator > 0, numerator / denominator, np.nan)
+
+    return pd.DataFrame(result, index=prices.index[1:], columns=pd.Index(names, name=by))
+
+
+def _compound(returns, base_date, start_levels):
+    """
+    Turns daily group returns into levels, with a base row on base_date.
+    Groups with a start level continue from it; groups without one start at
+    100 on the day before their first valid return. Gaps carry the level
+    forward.
+    """
+    columns = returns.columns
+    start_levels = start_levels.reindex(columns)
+    growth = pd.concat([
+        pd.DataFrame(1.0, index=base_date, columns=columns),
+        (1 + returns.fillna(0)).cumprod(),
+    ])
+    started = pd.concat([
+        pd.DataFrame(False, index=base_date, columns=columns),
+        returns.notna().cummax(),
+    ])
+    active = started | started.shift(-1, fill_value=False) | start_levels.notna()
+    return (growth * start_levels.fillna(100)).where(active)
+
+
+def build_indices(prices, total_return_prices, companies_df, by='Sector', weighting='cap', shares=None):
+    """
+    Index levels per group (Date x Group), 100 on the first date of the
+    price matrix or on the day before a group's first valid return.
+    """
+    returns = group_returns(prices, total_return_prices, companies_df, by, weighting, shares)
+    return _compound(returns, prices.index[:1], pd.Series(np.nan, index=returns.columns))
+
+
+def extend_indices(levels, prices, total_return_prices, companies_df, by='Sector', weighting='cap', shares=None):
+    """
+    Appends levels for the dates in prices after levels.index[-1], starting
+    from the last stored level. History is not recomputed; prices only needs
+    to contain the last stored date plus the new days.
+    """
+    last_date = levels.index[-1]
+    tail = prices.loc[last_date:]
+    if len(tail) < 2:
+        return levels
+
+    returns = group_returns(tail, total_return_prices.loc[last_date:], companies_df, by, weighting, shares)
+    returns = returns.reindex(columns=levels.columns.union(returns.columns))
+    new_levels = _compound(returns, tail.index[:1], levels.iloc[-1])
+    return pd.concat([levels.reindex(columns=returns.columns), new_levels.iloc[1:]])
+
+
+def history_fingerprint(prices, total_return_prices, companies_df, by='Sector'):
+    """
+    Per-symbol checksums of the history: Group, the sum of Close, and the
+    growth and sum of squared daily log returns of Adj Close. A release that
+    only appended days leaves all of them unchanged (a later dividend
+    rescales every earlier Adj Close alike, which leaves returns alone),
+    while revising any day or adjusting Close for a split changes them.
+    """
+    groups = companies_df.drop_duplicates('Symbol').set_index('Symbol')[by].reindex(prices.columns)
+    tr = total_return_prices.reindex(index=prices.index, columns=prices.columns).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_returns = np.diff(np.log(tr), axis=0)
+    return pd.DataFrame({
+        'Group': groups.astype(object).to_numpy(),
+        'Close Sum': np.nansum(prices.to_numpy(dtype=np.float64), axis=0),
+        'Growth': np.nansum(log_returns, axis=0),
+        'Squared Returns': np.nansum(log_returns ** 2, axis=0),
+    }, index=pd.Index(prices.columns, name='Symbol'))
+
+
+def _extends(state, prices, total_return_prices, companies_df, by, tolerance=1e-6):
+    """
+    True if prices only appends days to the history a stored state was
+    built from (same first date, constituents, groups and fingerprint).
+    """
+    levels, _, fingerprint = state
+    last_date = levels.index[-1]
+    if levels.index[0] != prices.index[0] or last_date not in prices.index:
+        return False
+    if not fingerprint.index.equals(prices.columns):
+        return False
+
+    history = prices.loc[:last_date]
+    current = history_fingerprint(history, total_return_prices.loc[:last_date], companies_df, by)
+    if not current['Group'].fillna('').equals(fingerprint['Group'].fillna('')):
+        return False
+    return all(
+        np.allclose(current[column], fingerprint[column], rtol=tolerance, atol=tolerance, equal_nan=True)
+        for column in ['Close Sum', 'Growth', 'Squared Returns']
+    )
+
+
+def update_indices(prices, total_return_prices, companies_df, by='Sector', weighting='cap', state=None):
+    """
+    New (levels, shares, fingerprint) state for the whole price matrix. A
+    previous state that prices merely extends (see _extends) gets only the
+    new days, weighted with its stored shares; otherwise the indices are
+    built in full from implied shares.
+    """
+    if state is not None and _extends(state, prices, total_return_prices, companies_df, by):
+        levels, shares, _ = state
+        levels = extend_indices(
+            levels, prices, total_return_prices, companies_df, by, weighting, shares.to_numpy()
+        )
+    else:
+        shares = pd.Series(implied_shares(prices, companies_df), index=prices.columns)
+        levels = build_indices(prices, total_return_prices, companies_df, by, weighting, shares.to_numpy())
+    return levels, shares, history_fingerprint(prices, total_return_prices, companies_df, by)
+
+
+def rebase(levels, start_date, base=100.0):
+    """
+    Rescales index levels so each group equals `base` on start_date (or on
+    its first valid day after it). One division, no recomputation.
+    """
+    window = levels.loc[pd.to_datetime(start_date):]
+    if window.empty:
+        return window
+    return window / window.bfill().iloc[0] * base
+
+
+def _state_key(source, by, weighting):
+    """
+    Disk cache key of the stored index state for one data source (see
+    load_data.data_source) and index. Tied to this module's code but not to
+    a release, so later releases can extend it.
+    """
+    return make_key('indices.state', code_hash(update_indices), source, (by, weighting), {})
+
+
+@st.cache_data(ttl=86400, max_entries=8)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_indices(by='Sector', weighting='cap'):
+    """
+    Cached index levels (base 100 at the first date) for one grouping and
+    weighting scheme, extended from the stored state of the previous
+    release when it still matches.
+    """
+    companies_df, _, _ = get_sp500_data()
+    key = _state_key(data_source(), by, weighting)
+    state = load(key, 'indices.state', default=None) if enabled() else None
+    with timed_stage(f"indices.build.{by}.{weighting}") as stage:
+        prices = get_price_matrix('Close')
+        state = update_indices(prices, get_price_matrix('Adj Close'), companies_df, by, weighting, state)
+        stage.rows = prices.size
+    if enabled():
+        store(key, state, 'indices.state', overwrite=True)
+    levels, _, _ = state
+    return levels
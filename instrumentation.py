@@ -0,0 +1,285 @@
+"""
+Lightweight timing and memory instrumentation for the loader and page sections.
+
+Wrap a hot path with the `timed_stage` context manager (or the `instrumented`
+decorator) to record wall time, rows processed and bytes allocated:
+
+    with timed_stage("eda.chart1.groupby") as stage:
+        exchange_performance = ...
+        stage.rows = len(stocks_with_exchange)
+
+Records are kept in memory and exposed three ways:
+  - `render_debug_panel()` shows the stages of the current rerun in the sidebar
+  - every stage is logged as one JSON line on the "sp500.perf" logger
+  - `prometheus_text()` returns cumulative per-stage metrics in Prometheus format
+
+Allocation tracking uses tracemalloc and is only switched on when the
+SP500_PROFILE environment variable is set (or `enable_memory_tracking()` is
+called), because tracing every allocation slows pandas down noticeably.
+Timing is always on.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+logger = logging.getLogger("sp500.perf")
+
+# Most recent stage records across all sessions (for the Prometheus dump)
+MAX_RECORDS = 5000
+
+_lock = threading.Lock()
+_records = deque(maxlen=MAX_RECORDS)
+_totals = {}
+_local = threading.local()
+
+
+class StageRecord:
+    """
+    Measurements for one execution of an instrumented stage.
+    Set `rows` inside the `with` block to report how many rows were processed.
+    """
+
+    __slots__ = ('name', 'start', 'wall_ms', 'rows', 'alloc_bytes', 'depth', '_child_peak', '_mem_start')
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.start = time.time()
+        self.wall_ms = 0.0
+        self.rows = None
+        self.alloc_bytes = None
+        self._child_peak = 0
+        self._mem_start = 0
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'depth': self.depth,
+            'wall_ms': round(self.wall_ms, 3),
+            'rows': self.rows,
+            'alloc_bytes': self.alloc_bytes,
+        }
+
+
+def enable_memory_tracking():
+    """
+    Starts tracemalloc so stages also report allocated bytes.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def memory_tracking_enabled():
+    return tracemalloc.is_tracing()
+
+
+if os.environ.get("SP500_PROFILE"):
+    enable_memory_tracking()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+        _local.run = []
+    return _local.stack
+
+
+class timed_stage:
+    """
+    Context manager that times a block and records it under `name`.
+
+    Stages can be nested; allocated bytes are the peak traced memory during
+    the block minus the memory in use when it started. With several sessions
+    running at once the allocation figures include other threads' work and
+    should be read as approximate.
+    """
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        stack = _stack()
+        record = StageRecord(self.name, len(stack))
+        record.rows = self.rows
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # Keep the parent's peak before resetting it for this stage
+            if stack:
+                stack[-1]._child_peak = max(stack[-1]._child_peak, peak)
+            tracemalloc.reset_peak()
+            record._mem_start = current
+
+        stack.append(record)
+        self._record = record
+        self._t0 = time.perf_counter()
+        return record
+
+    def __exit__(self, *exc):
+        record = self._record
+        record.wall_ms = (time.perf_counter() - self._t0) * 1000
+
+        stack = _stack()
+        stack.pop()
+
+        if tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, record._child_peak)
+            record.alloc_bytes = max(peak - record._mem_start, 0)
+            if stack:
+                stack[-1]._child_peak = max(stack[-1]._child_peak, peak)
+
+        _store(record)
+        return False
+
+
+def instrumented(name=None):
+    """
+    Decorator form of `timed_stage`. If the function returns something with a
+    length (e.g. a DataFrame), that length is recorded as rows processed.
+    """
+    def decorator(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed_stage(stage_name) as stage:
+                result = func(*args, **kwargs)
+                if stage.rows is None and hasattr(result, '__len__') and not isinstance(result, (str, tuple)):
+                    stage.rows = len(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _store(record):
+    _local.run.append(record)
+
+    with _lock:
+        _records.append(record)
+        totals = _totals.setdefault(record.name, {
+            'count': 0, 'wall_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'alloc_bytes': 0,
+        })
+        totals['count'] += 1
+        totals['wall_ms'] += record.wall_ms
+        totals['max_ms'] = max(totals['max_ms'], record.wall_ms)
+        totals['rows'] += record.rows or 0
+        totals['alloc_bytes'] += record.alloc_bytes or 0
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(record.as_dict()))
+
+
+# ====================
+# REPORTING
+# ====================
+
+def current_run_records(clear=False):
+    """
+    Stage records collected on this thread (one Streamlit script run) so far.
+    """
+    _stack()
+    records = list(_local.run)
+    if clear:
+        _local.run = []
+    return records
+
+
+def stage_totals():
+    """
+    Cumulative per-stage totals since the process started.
+    """
+    with _lock:
+        return {name: dict(values) for name, values in _totals.items()}
+
+
+def reset():
+    """
+    Clears all recorded stages (useful between benchmark runs).
+    """
+    with _lock:
+        _records.clear()
+        _totals.clear()
+    _stack()
+    _local.run = []
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def prometheus_text():
+    """
+    Returns cumulative stage metrics in the Prometheus text exposition format.
+    """
+    metrics = [
+        ('sp500_stage_calls_total', 'counter', 'Number of times the stage ran', 'count', 1),
+        ('sp500_stage_seconds_total', 'counter', 'Total wall time spent in the stage', 'wall_ms', 1e-3),
+        ('sp500_stage_max_seconds', 'gauge', 'Slowest single execution of the stage', 'max_ms', 1e-3),
+        ('sp500_stage_rows_total', 'counter', 'Rows processed by the stage', 'rows', 1),
+        ('sp500_stage_alloc_bytes_total', 'counter', 'Bytes allocated by the stage (tracemalloc)', 'alloc_bytes', 1),
+    ]
+    totals = stage_totals()
+    lines = []
+    for metric, kind, help_text, key, scale in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name in sorted(totals):
+            value = totals[name][key] * scale
+            lines.append(f'{metric}{{stage="{_escape_label(name)}"}} {value:.6g}')
+    return "\n".join(lines) + "\n"
+
+
+def debug_enabled():
+    """
+    The debug panel shows when SP500_DEBUG is set or the URL has ?debug=1.
+    """
+    if os.environ.get("SP500_DEBUG"):
+        return True
+    import streamlit as st
+    try:
+        return st.query_params.get("debug") in ("1", "true")
+    except Exception:
+        return False
+
+
+def render_debug_panel():
+    """
+    Shows the stages recorded during this rerun in a sidebar expander.
+    Call it at the end of a page script.
+    """
+    records = current_run_records(clear=True)
+    if not debug_enabled():
+        return
+
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("🐞 Performance Debug", expanded=False):
+        if not records:
+            st.caption("No instrumented stages ran in this rerun (results may be cached).")
+        else:
+            table = pd.DataFrame([r.as_dict() for r in records])
+            table['stage'] = ['  ' * d + s for d, s in zip(table['depth'], table['stage'])]
+            table = table.drop(columns='depth')
+            top_level = sum(r.wall_ms for r in records if r.depth == 0)
+            st.metric("Instrumented time", f"{top_level:,.0f} ms")
+            st.dataframe(table, hide_index=True, width='stretch')
+            if not memory_tracking_enabled():
+                st.caption("Set SP500_PROFILE=1 to record allocated bytes.")
+
+        st.download_button(
+            "Download metrics (Prometheus)",
+            data=prometheus_text(),
+            file_name="sp500_metrics.prom",
+            mime="text/plain",
+        )
@@ -0,0 +1,272 @@
+"""
+Background jobs for long computations, so a page never blocks on them.
+
+A page hands a cached getter (e.g. computations.get_volatility) and its
+arguments to a small thread pool shared by all sessions and gets a Job back
+immediately. Identical calls (same function and arguments) are
+deduplicated: a second session asking for a simulation that is already
+running attaches to that job instead of starting another one. The result
+also lands in the getter's st.cache_data entry, so once a job has finished
+every later call is an ordinary cache hit.
+
+Only real work goes to the pool: `job_result` first looks the call up in
+the getter's st.cache_data entry and returns a hit inline on the caller's
+thread, so a cached result never waits behind long simulations that occupy
+the workers.
+
+On a page, `job_result` waits a moment (quick jobs finish within it, so
+nothing flickers); if the job is still running it draws a progress
+placeholder that polls the job from an auto-refreshing fragment and reruns
+the page once the result is ready:
+
+    volatility_df = job_result(get_volatility, price_mode, label="Computing volatility")
+    if volatility_df is None:
+        return  # placeholder shown, the page fills in when the job is done
+
+Long-running code can report progress without knowing whether it runs in a
+job (outside one the call does nothing):
+
+    for i, chunk in enumerate(chunks):
+        ...
+        report_progress((i + 1) / len(chunks), f"{i + 1} of {len(chunks)} chunks")
+
+Jobs run on threads rather than processes: they read the process-wide
+Streamlit caches and price matrices, and numpy/pandas release the GIL in
+their heavy loops, so script threads of other reruns keep running.
+
+Environment:
+    SP500_JOB_WORKERS   threads in the job pool (default: 2)
+    SP500_JOB_GRACE     seconds to wait before showing a placeholder (default: 0.3)
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import streamlit as st
+from instrumentation import timed_stage, current_run_records
+
+logger = logging.getLogger("sp500.jobs")
+
+try:
+    from streamlit.runtime.caching.cache_utils import CachedFunc, _make_value_key
+    from streamlit.runtime.caching.cache_errors import CacheKeyNotFoundError
+except ImportError:
+    # Streamlit internals moved: every call then goes through the pool
+    CachedFunc = None
+
+JOB_WORKERS = int(os.environ.get("SP500_JOB_WORKERS", 2))
+GRACE_SECONDS = float(os.environ.get("SP500_JOB_GRACE", 0.3))
+
+# How often a waiting page checks on its job
+POLL_SECONDS = 0.5
+
+# Finished jobs stay attached for this long, so every session polling a job
+# sees its outcome (including errors) before it is dropped
+KEEP_FINISHED_SECONDS = 60
+
+_local = threading.local()
+
+# Returned by cached_value when the call is not cached
+MISS = object()
+
+
+class _JobThreadFilter(logging.Filter):
+    """
+    Drops Streamlit's "missing ScriptRunContext" warning for job threads:
+    the cached getters they call need no session, so it is expected there.
+    """
+
+    def filter(self, record):
+        return not record.threadName.startswith('sp500-job')
+
+
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(_JobThreadFilter())
+
+
+class Job:
+    """
+    One submitted computation. `progress` is a fraction in [0, 1], or None
+    while the job has not reported any.
+    """
+
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.progress = None
+        self.message = ''
+        self.submitted = time.time()
+        self.finished = None
+        self.future = None
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    @property
+    def queued(self):
+        """
+        True while the job waits for a free worker.
+        """
+        return not (self.future.running() or self.future.done())
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.submitted
+
+    def wait(self, timeout=None):
+        """
+        Waits up to timeout seconds; True if the job has finished.
+        """
+        wait([self.future], timeout=timeout)
+        return self.done
+
+    def result(self, timeout=None):
+        """
+        The job's return value; re-raises the exception if it failed.
+        """
+        return self.future.result(timeout)
+
+
+def job_key(func, args, kwargs):
+    """
+    Identity of a call: the function's qualified name and its arguments
+    (which must be hashable, as for any cached getter).
+    """
+    return (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+
+def cached_value(func, args, kwargs):
+    """
+    Value of a st.cache_data/st.cache_resource getter's call if it is
+    already cached, otherwise MISS; never computes anything. Reads the
+    getter's cache the way Streamlit's own wrapper does, so anything else
+    (a plain function, a different Streamlit version) counts as a miss.
+    """
+    if CachedFunc is None or not isinstance(func, CachedFunc):
+        return MISS
+    try:
+        info = func._info
+        value_key = _make_value_key(
+            cache_type=info.cache_type, func=info.func, func_args=args,
+            func_kwargs=kwargs, hash_funcs=info.hash_funcs
+        )
+        result = info.get_function_cache(func._function_key).read_result(value_key)
+    except CacheKeyNotFoundError:
+        return MISS
+    except Exception:
+        logger.debug("Cache lookup failed for %s", func, exc_info=True)
+        return MISS
+    return func._handle_cache_hit(result)
+
+
+class JobExecutor:
+    """
+    Thread pool plus a registry of running and recently finished jobs.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sp500-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, label=None, **kwargs):
+        """
+        Runs func(*args, **kwargs) in the background, or returns the job
+        already running (or just finished) for the same call.
+        """
+        key = job_key(func, args, kwargs)
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(key)
+            if job is None:
+                job = Job(key, label or func.__name__)
+                job.future = self._pool.submit(self._run, job, func, args, kwargs)
+                self._jobs[key] = job
+            return job
+
+    def _run(self, job, func, args, kwargs):
+        _local.job = job
+        try:
+            with timed_stage(f"jobs.{func.__name__}"):
+                return func(*args, **kwargs)
+        except Exception:
+            logger.exception("Job %s failed", job.label)
+            raise
+        finally:
+            _local.job = None
+            job.finished = time.time()
+            # Nobody renders a debug panel on this thread, drop its records
+            current_run_records(clear=True)
+
+    def _evict(self):
+        cutoff = time.time() - KEEP_FINISHED_SECONDS
+        for key in [k for k, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+            del self._jobs[key]
+
+    def jobs(self):
+        """
+        Snapshot of the registered jobs, oldest first.
+        """
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted)
+
+
+@st.cache_resource
+def get_job_executor():
+    """
+    The executor shared by every session of this server process.
+    """
+    return JobExecutor()
+
+
+def report_progress(fraction, message=''):
+    """
+    Updates the progress of the job running on this thread, if any.
+    """
+    job = getattr(_local, 'job', None)
+    if job is not None:
+        job.progress = min(max(fraction, 0.0), 1.0)
+        job.message = message
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _job_progress(job):
+    """
+    Placeholder for a running job; reruns the page when it is done.
+    """
+    if job.done:
+        st.rerun()
+
+    if job.queued:
+        detail = " waiting for a free worker"
+    else:
+        detail = f" {job.message}" if job.message else ''
+    text = f"⏳ {job.label}…{detail} ({job.elapsed:.0f} s)"
+    if job.progress is None:
+        st.info(text)
+    else:
+        st.progress(job.progress, text=text)
+
+
+def job_result(func, *args, label=None, grace=GRACE_SECONDS, **kwargs):
+    """
+    Result of func(*args, **kwargs) computed in the background.
+
+    A result already in func's Streamlit cache is returned directly,
+    without a job. Otherwise returns the result if it is ready within
+    `grace` seconds (re-raising the job's exception if it failed), or shows
+    a progress placeholder and returns None; the page reruns once the job
+    is done.
+    """
+    value = cached_value(func, args, kwargs)
+    if value is not MISS:
+        return value
+
+    job = get_job_executor().submit(func, *args, label=label, **kwargs)
+    if not job.wait(grace):
+        _job_progress(job)
+        return None
+    return job.result()
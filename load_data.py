@@ -1,41 +1,178 @@
 import kagglehub
 import pandas as pd
+import hashlib
 import os
+from instrumentation import timed_stage
+from data_quality import validate_sp500_data
+from price_modes import split_adjusted_close
+from disk_cache import disk_cache
 
-def load_sp500_data():
+DATA_FILES = ["sp500_companies.csv", "sp500_stocks.csv", "sp500_index.csv"]
+
+KAGGLE_DATASET = "andrewmvd/sp-500-stocks"
+
+# (path, file stats) -> content hash, so each process hashes a release once
+_snapshots = {}
+
+def get_data_path():
     """
-    Downloads the latest S&P 500 dataset from Kaggle using kagglehub.
-    Returns dataframes for companies, stocks, and index.
+    Folder holding the three CSV files: SP500_DATA_DIR if set, otherwise
+    the latest Kaggle release downloaded with kagglehub.
     """
-    print("📥 Downloading latest S&P 500 data from Kaggle...")
-    
-    # Download latest dataset (kagglehub handles caching and updates)
-    path = kagglehub.dataset_download("andrewmvd/sp-500-stocks")
+    path = os.environ.get("SP500_DATA_DIR")
     
-    print(f"✅ Dataset downloaded to: {path}")
+    if path:
+        print(f"📂 Loading S&P 500 data from local folder: {path}")
+    else:
+        print("📥 Downloading latest S&P 500 data from Kaggle...")
+        
+        # Download latest dataset (kagglehub handles caching and updates)
+        path = kagglehub.dataset_download(KAGGLE_DATASET)
+        
+        print(f"✅ Dataset downloaded to: {path}")
     
+    return path
+
+def data_source():
+    """
+    Where releases come from: the SP500_DATA_DIR folder or the Kaggle
+    dataset. Unlike the download path it is the same for every release.
+    """
+    return os.environ.get("SP500_DATA_DIR") or KAGGLE_DATASET
+
+def dataset_snapshot(path):
+    """
+    Content hash of the three CSV files. Identifies the data release in
+    disk cache keys, so results survive restarts but never outlive the data.
+    """
+    stats = tuple(
+        (name, info.st_size, info.st_mtime_ns)
+        for name in DATA_FILES
+        for info in [os.stat(os.path.join(path, name))]
+    )
+    if (path, stats) not in _snapshots:
+        digest = hashlib.sha256()
+        for name in DATA_FILES:
+            with open(os.path.join(path, name), 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        _snapshots[(path, stats)] = digest.hexdigest()[:16]
+    return _snapshots[(path, stats)]
+
+def load_sp500_dataset():
+    """
+    Downloads the latest S&P 500 dataset from Kaggle using kagglehub and
+    validates it (see data_quality.py).
+    Returns cleaned dataframes for companies, stocks, and index, plus the
+    quality report and per-symbol first/last valid dates.
+
+    Set the SP500_DATA_DIR environment variable to a folder containing the
+    three CSV files to load a local (or synthetic) copy instead.
+    """
+    path = get_data_path()
+    return read_sp500_dataset(path, dataset_snapshot(path))
+
+@disk_cache()
+def read_sp500_dataset(path, snapshot):
+    """
+    Reads and validates the CSV files in path and adds the 'Split Close'
+    price mode. Persisted in the disk cache under the release's snapshot
+    hash, so restarts skip CSV parsing.
+    """
     # Load the three CSV files
-    companies_df = pd.read_csv(os.path.join(path, "sp500_companies.csv"))
-    stocks_df = pd.read_csv(os.path.join(path, "sp500_stocks.csv"))
-    index_df = pd.read_csv(os.path.join(path, "sp500_index.csv"))
+    with timed_stage("load.read_companies") as stage:
+        companies_df = pd.read_csv(os.path.join(path, "sp500_companies.csv"))
+        stage.rows = len(companies_df)
+    with timed_stage("load.read_stocks") as stage:
+        stocks_df = pd.read_csv(os.path.join(path, "sp500_stocks.csv"))
+        stage.rows = len(stocks_df)
+    with timed_stage("load.read_index") as stage:
+        index_df = pd.read_csv(os.path.join(path, "sp500_index.csv"))
+        stage.rows = len(index_df)
     
     # Convert date columns to datetime
-    stocks_df['Date'] = pd.to_datetime(stocks_df['Date'])
-    index_df['Date'] = pd.to_datetime(index_df['Date'])
+    with timed_stage("load.parse_dates", rows=len(stocks_df) + len(index_df)):
+        stocks_df['Date'] = pd.to_datetime(stocks_df['Date'])
+        index_df['Date'] = pd.to_datetime(index_df['Date'])
+    
+    # Drop rows that would corrupt later groupbys (NaN prices, duplicates, ...)
+    raw_rows = len(stocks_df)
+    with timed_stage("load.validate", rows=raw_rows):
+        companies_df, stocks_df, index_df, quality_report, symbol_ranges = validate_sp500_data(
+            companies_df, stocks_df, index_df
+        )
+    
+    # Precompute the split-adjusted price mode once (see price_modes.py)
+    with timed_stage("load.price_modes", rows=len(stocks_df)):
+        stocks_df['Split Close'], splits = split_adjusted_close(stocks_df)
+        quality_report = pd.concat([quality_report, pd.DataFrame([{
+            'Table': 'stocks', 'Check': 'Unadjusted split in Close', 'Rows': len(splits),
+            'Action': "Adjusted in 'Split Close'",
+        }])], ignore_index=True)
     
     print(f"📊 Loaded {len(companies_df)} companies")
-    print(f"📈 Loaded {len(stocks_df)} stock records")
+    print(f"📈 Loaded {len(stocks_df)} stock records ({raw_rows - len(stocks_df)} removed by quality checks)")
     print(f"📉 Loaded {len(index_df)} index records")
     
+    return companies_df, stocks_df, index_df, quality_report, symbol_ranges
+
+def load_sp500_data():
+    """
+    Returns the validated companies, stocks, and index dataframes.
+    """
+    companies_df, stocks_df, index_df, _, _ = load_sp500_dataset()
     return companies_df, stocks_df, index_df
 
 # Add caching for Streamlit to avoid re-downloading on every interaction
 import streamlit as st
 
 @st.cache_data(ttl=86400)  # Cache for 24 hours (86400 seconds)
+def get_data_release():
+    """
+    Folder and snapshot hash of the current data release.
+    Checks for a new release (re-downloads) once per day.
+    """
+    path = get_data_path()
+    return path, dataset_snapshot(path)
+
+@st.cache_resource(ttl=86400, max_entries=1)
+def get_release_dataset(path, snapshot):
+    """
+    Validated dataset of one release, cached under its snapshot. Shared (not
+    copied) between sessions and callers, so reading one small table never
+    copies the 1.9M-row stocks table. Treat the returned DataFrames as read-only.
+    """
+    return read_sp500_dataset(path, snapshot)
+
+def get_sp500_dataset():
+    """
+    Cached version for Streamlit: the dataset of the current release.
+    Looked up by the same snapshot that keys derived results in the disk
+    cache, so a result is never stored under a release it was not computed
+    from.
+    """
+    return get_release_dataset(*get_data_release())
+
 def get_sp500_data():
     """
-    Cached version for Streamlit.
-    Re-downloads data once per day.
+    Cached, validated companies, stocks, and index dataframes (shared,
+    treat as read-only).
+    """
+    companies_df, stocks_df, index_df, _, _ = get_sp500_dataset()
+    return companies_df, stocks_df, index_df
+
+def get_dataset_snapshot():
+    """
+    Snapshot hash of the current data release, for keying derived results
+    in the disk cache (see disk_cache.py).
+    """
+    _, snapshot = get_data_release()
+    return snapshot
+
+@st.cache_data(ttl=86400)
+def get_data_quality():
+    """
+    Quality report and per-symbol first/last valid dates from the last load.
     """
-    return load_sp500_data()
+    _, _, _, quality_report, symbol_ranges = get_sp500_dataset()
+    return quality_report, symbol_ranges
@@ -0,0 +1,564 @@
+"""
+Concurrent-session load test for the Streamlit pages.
+
+Simulates N simultaneous users inside a single process using Streamlit's
+AppTest runner. Each simulated session opens a page and then drives its
+widgets with a random sequence of filter changes (Dashboard sidebar filters,
+EDA sector multiselect), timing every rerun and sampling the process RSS.
+
+Running the sweep for several session counts produces a saturation curve
+(latency and throughput vs. concurrent sessions) that is written to JSON so
+two releases can be compared:
+
+    python load_test.py --sessions 1 2 4 8 --output results_new.json
+    python load_test.py --sessions 1 2 4 8 --baseline results_old.json
+
+By default a synthetic dataset is generated in a temp folder and loaded
+through SP500_DATA_DIR, so no Kaggle download is needed.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SECTORS = [
+    'Technology', 'Financial Services', 'Healthcare', 'Industrials',
+    'Consumer Cyclical', 'Consumer Defensive', 'Communication Services',
+    'Energy', 'Utilities', 'Real Estate', 'Basic Materials'
+]
+EXCHANGES = ['NYQ', 'NMS', 'NGM']
+
+
+def find_page(keyword):
+    """
+    Returns the path of the page script whose file name contains keyword
+    (page file names start with a number and an emoji).
+    """
+    matches = glob.glob(os.path.join(ROOT, "pages", f"*{keyword}*.py"))
+    if not matches:
+        raise FileNotFoundError(f"No page matching '{keyword}' in pages/")
+    return matches[0]
+
+
+PAGES = {
+    'dashboard': find_page('Dashboard'),
+    'eda': find_page('EDA_Gallery'),
+}
+
+
+# ====================
+# SYNTHETIC DATASET
+# ====================
+
+def make_synthetic_dataset(out_dir, n_symbols=500, n_days=1000, seed=0):
+    """
+    Writes sp500_companies.csv, sp500_stocks.csv and sp500_index.csv with the
+    same columns as the Kaggle dataset. Prices follow a geometric random walk
+    with a shared market factor; some symbols start trading late so the stock
+    file contains leading NaN rows like the real data.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    symbols = [f"S{i:03d}" for i in range(n_symbols)]
+    dates = pd.bdate_range(end=pd.Timestamp('2024-12-31'), periods=n_days)
+
+    # Companies
+    marketcap = np.exp(rng.normal(24.5, 1.2, n_symbols)).round()
+    companies_df = pd.DataFrame({
+        'Exchange': rng.choice(EXCHANGES, n_symbols, p=[0.6, 0.35, 0.05]),
+        'Symbol': symbols,
+        'Shortname': [f"Company {s}" for s in symbols],
+        'Longname': [f"Company {s} Inc." for s in symbols],
+        'Sector': rng.choice(SECTORS, n_symbols),
+        'Industry': 'Synthetic',
+        'Currentprice': 0.0,
+        'Marketcap': marketcap,
+        'Ebitda': (marketcap * rng.uniform(0.02, 0.1, n_symbols)).round(),
+        'Revenuegrowth': rng.normal(0.06, 0.12, n_symbols).round(3),
+        'City': 'Denver',
+        'State': 'CO',
+        'Country': 'United States',
+        'Fulltimeemployees': rng.integers(1_000, 200_000, n_symbols),
+        'Longbusinesssummary': '',
+        'Weight': marketcap / marketcap.sum(),
+    })
+
+    # Prices: market factor + idiosyncratic noise
+    market = rng.normal(0.0003, 0.011, n_days)
+    beta = rng.uniform(0.5, 1.6, n_symbols)
+    idio = rng.normal(0, 1, (n_days, n_symbols)) * rng.uniform(0.008, 0.03, n_symbols)
+    log_returns = market[:, None] * beta + idio
+    close = rng.uniform(20, 500, n_symbols) * np.exp(np.cumsum(log_returns, axis=0))
+    dividend_drift = np.exp(np.linspace(-0.15, 0, n_days))[:, None]
+    adj_close = close * dividend_drift
+
+    # Late listings: prices are NaN before the first trading day
+    first_day = np.where(rng.random(n_symbols) < 0.05, rng.integers(1, n_days // 2, n_symbols), 0)
+    listed = np.arange(n_days)[:, None] >= first_day
+    close = np.where(listed, close, np.nan)
+    adj_close = np.where(listed, adj_close, np.nan)
+    volume = np.where(listed, rng.integers(100_000, 20_000_000, (n_days, n_symbols)), np.nan)
+
+    companies_df['Currentprice'] = close[-1].round(2)
+
+    stocks_df = pd.DataFrame({
+        'Date': np.repeat(dates.strftime('%Y-%m-%d'), n_symbols),
+        'Symbol': np.tile(symbols, n_days),
+        'Adj Close': adj_close.ravel(),
+        'Close': close.ravel(),
+        'High': (close * 1.01).ravel(),
+        'Low': (close * 0.99).ravel(),
+        'Open': close.ravel(),
+        'Volume': volume.ravel(),
+    })
+
+    index_df = pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'),
+        'S&P500': (3000 * np.exp(np.cumsum(market))).round(2),
+    })
+
+    companies_df.to_csv(os.path.join(out_dir, "sp500_companies.csv"), index=False)
+    stocks_df.to_csv(os.path.join(out_dir, "sp500_stocks.csv"), index=False)
+    index_df.to_csv(os.path.join(out_dir, "sp500_index.csv"), index=False)
+
+    return out_dir
+
+
+# ====================
+# MEMORY SAMPLING
+# ====================
+
+def current_rss_mb():
+    """
+    Resident set size of this process in MB (Linux /proc, falls back to the
+    peak RSS reported by the resource module).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler:
+    """
+    Background thread that samples RSS at a fixed interval and keeps the peak.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# ====================
+# SESSION SIMULATION
+# ====================
+
+def install_shared_runtime():
+    """
+    AppTest installs a mock Runtime and patches config for the duration of
+    each run, then tears them down, so two AppTests in different threads
+    clobber each other. For concurrent sessions we install one mock Runtime
+    for the whole process (like a real server, every session shares it) and
+    keep the config patch active until the returned context is closed.
+    """
+    from unittest.mock import MagicMock
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1.util import patch_config_options
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    return patch_config_options({"global.appTest": True})
+
+
+def make_app_test(page, timeout):
+    """
+    Builds an AppTest whose runs reuse the shared runtime from
+    install_shared_runtime() instead of creating and destroying their own.
+
+    Plain AppTest always reruns the whole script. Like the browser, this one
+    can also rerun just the st.fragment that owns a changed widget
+    (`run_fragment`), keeping fragment storage alive between runs.
+    """
+    from urllib import parse
+
+    from streamlit.runtime.fragment import MemoryFragmentStorage
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+    from streamlit.testing.v1 import AppTest
+    from streamlit.testing.v1.element_tree import parse_tree_from_messages
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas
+
+    class SharedRuntimeAppTest(AppTest):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.fragment_storage = MemoryFragmentStorage()
+            self.widget_fragments = {}
+            self.fragment_errors = []
+
+        def _run(self, widget_state=None, timeout=None, fragment_id=None):
+            if timeout is None:
+                timeout = self.default_timeout
+            pages_manager = PagesManager(self._script_path, ScriptCache(), setup_watcher=False)
+            script_runner = LocalScriptRunner(
+                self._script_path,
+                self.session_state,
+                pages_manager,
+                args=self.args,
+                kwargs=self.kwargs,
+            )
+            script_runner._fragment_storage = self.fragment_storage
+
+            script_runner.request_rerun(RerunData(
+                widget_states=widget_state,
+                query_string=parse.urlencode(self.query_params or {}, doseq=True),
+                page_script_hash=self._page_hash,
+                fragment_id_queue=[fragment_id] if fragment_id else [],
+                is_fragment_scoped_rerun=fragment_id is not None,
+            ))
+            script_runner.start()
+            require_widgets_deltas(script_runner, timeout)
+
+            messages = script_runner.forward_msgs()
+            self._record_widget_fragments(messages)
+            tree = parse_tree_from_messages(messages)
+            if fragment_id is None:
+                self._tree = tree
+                self._tree._runner = self
+                self.fragment_errors = []
+            else:
+                # A fragment run only sends that fragment's elements, so keep
+                # the full tree from the last full run for widget lookups
+                self.fragment_errors = [e.message for e in tree.exception]
+            return self
+
+        def _record_widget_fragments(self, messages):
+            for msg in messages:
+                if msg.WhichOneof('type') != 'delta' or not msg.delta.fragment_id:
+                    continue
+                if msg.delta.WhichOneof('type') != 'new_element':
+                    continue
+                element = msg.delta.new_element
+                proto = getattr(element, element.WhichOneof('type'))
+                widget_id = getattr(proto, 'id', None)
+                if widget_id:
+                    self.widget_fragments[widget_id] = msg.delta.fragment_id
+
+        def fragment_of(self, widget):
+            return self.widget_fragments.get(widget.id)
+
+        def run_fragment(self, fragment_id, timeout=None):
+            return self._run(self._tree.get_widget_states(), timeout, fragment_id=fragment_id)
+
+    return SharedRuntimeAppTest(PAGES[page], default_timeout=timeout)
+
+
+def random_subset(rng, options, max_size=4):
+    """
+    Picks a non-empty random subset of options.
+    """
+    options = list(options)
+    size = rng.randint(1, min(max_size, len(options)))
+    return rng.sample(options, size)
+
+
+def drive_dashboard(at, rng):
+    """
+    Applies one random change to the Dashboard sidebar filters.
+    """
+    action = rng.choice(['sectors', 'exchanges', 'top_n', 'dates'])
+
+    if action == 'sectors':
+        widget = at.sidebar.multiselect[0]
+        widget.set_value(random_subset(rng, widget.options))
+    elif action == 'exchanges':
+        widget = at.sidebar.multiselect[1]
+        widget.set_value(random_subset(rng, widget.options))
+    elif action == 'top_n':
+        widget = at.sidebar.slider[0]
+        widget.set_value(rng.randrange(10, 101, 10))
+    else:
+        widget = at.sidebar.date_input[0]
+        lo = date.fromisoformat(widget.proto.min.replace('/', '-'))
+        hi = date.fromisoformat(widget.proto.max.replace('/', '-'))
+        days = pd.date_range(lo, hi).date
+        start, end = sorted(rng.sample(list(days), 2))
+        widget.set_value((start, end))
+
+    return action, widget
+
+
+def drive_eda(at, rng):
+    """
+    Applies one random change to the EDA Gallery sector multiselect.
+    """
+    widget = at.multiselect[0]
+    widget.set_value(random_subset(rng, widget.options))
+    return 'sectors', widget
+
+
+DRIVERS = {'dashboard': drive_dashboard, 'eda': drive_eda}
+
+
+def run_session(page, n_interactions, seed, timeout, fragment_reruns=True):
+    """
+    Runs one simulated user session and returns a list of per-rerun records.
+    The first record is the initial page load. When fragment_reruns is on, a
+    change to a widget inside an st.fragment only reruns that fragment, as it
+    would in the browser.
+    """
+    rng = random.Random(seed)
+    at = make_app_test(page, timeout)
+    records = []
+
+    def timed_run(action, fragment_id=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            if fragment_id:
+                at.run_fragment(fragment_id)
+                if at.fragment_errors:
+                    error = at.fragment_errors[0]
+            else:
+                at.run()
+                if at.exception:
+                    error = at.exception[0].message
+        except Exception as exc:  # timeouts and script errors count as failures
+            error = repr(exc)
+        records.append({
+            'page': page,
+            'action': action,
+            'scope': 'fragment' if fragment_id else 'full',
+            'latency_ms': (time.perf_counter() - start) * 1000,
+            'rss_mb': current_rss_mb(),
+            'error': error,
+        })
+        return error is None
+
+    if not timed_run('initial_load'):
+        return records
+
+    for _ in range(n_interactions):
+        try:
+            action, widget = DRIVERS[page](at, rng)
+        except Exception as exc:  # widget missing from the last tree
+            records.append({
+                'page': page, 'action': 'drive', 'scope': None, 'latency_ms': 0.0,
+                'rss_mb': current_rss_mb(), 'error': repr(exc),
+            })
+            break
+        fragment_id = at.fragment_of(widget) if fragment_reruns else None
+        if not timed_run(action, fragment_id):
+            break
+
+    return records
+
+
+def run_level(n_sessions, pages, n_interactions, seed, timeout, fragment_reruns=True):
+    """
+    Runs n_sessions concurrent sessions (round-robin over pages) and
+    summarizes their rerun latencies.
+    """
+    with RssSampler() as sampler, ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        start = time.perf_counter()
+        futures = [
+            pool.submit(
+                run_session, pages[i % len(pages)], n_interactions, seed * 1000 + i, timeout, fragment_reruns
+            )
+            for i in range(n_sessions)
+        ]
+        records = [r for f in futures for r in f.result()]
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in records if r['error'] is None]
+    reruns = [r['latency_ms'] for r in ok if r['action'] != 'initial_load']
+    loads = [r['latency_ms'] for r in ok if r['action'] == 'initial_load']
+
+    def pct(values, q):
+        return float(np.percentile(values, q)) if values else None
+
+    summary = {
+        'sessions': n_sessions,
+        'reruns': len(records),
+        'errors': len(records) - len(ok),
+        'initial_load_p50_ms': pct(loads, 50),
+        'rerun_p50_ms': pct(reruns, 50),
+        'rerun_p95_ms': pct(reruns, 95),
+        'rerun_max_ms': max(reruns) if reruns else None,
+        'throughput_rps': len(ok) / elapsed if elapsed else None,
+        'rss_peak_mb': sampler.peak_mb,
+        'elapsed_s': elapsed,
+    }
+    per_page = {}
+    for page in pages:
+        page_reruns = [r['latency_ms'] for r in ok if r['page'] == page and r['action'] != 'initial_load']
+        per_page[page] = {'rerun_p50_ms': pct(page_reruns, 50), 'rerun_p95_ms': pct(page_reruns, 95)}
+    summary['pages'] = per_page
+    summary['fragment_reruns'] = sum(1 for r in ok if r['scope'] == 'fragment')
+
+    first_error = next((r['error'] for r in records if r['error']), None)
+    if first_error:
+        summary['first_error'] = first_error
+
+    return summary
+
+
+# ====================
+# REPORTING
+# ====================
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ms(value):
+    return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+
+def print_curve(levels, baseline=None):
+    """
+    Prints the saturation curve, with p95 deltas against a baseline run if given.
+    """
+    base = {lvl['sessions']: lvl for lvl in (baseline or {}).get('levels', [])}
+    header = f"{'sessions':>8} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'rerun/s':>8} {'RSS MB':>8} {'errors':>6}"
+    if base:
+        header += f" {'Δp95':>8}"
+    print(header)
+
+    for lvl in levels:
+        line = (
+            f"{lvl['sessions']:>8} {format_ms(lvl['rerun_p50_ms'])} {format_ms(lvl['rerun_p95_ms'])} "
+            f"{format_ms(lvl['rerun_max_ms'])} {lvl['throughput_rps']:8.2f} {lvl['rss_peak_mb']:8.0f} "
+            f"{lvl['errors']:>6}"
+        )
+        old = base.get(lvl['sessions'])
+        if old and old.get('rerun_p95_ms') and lvl['rerun_p95_ms']:
+            change = (lvl['rerun_p95_ms'] / old['rerun_p95_ms'] - 1) * 100
+            line += f" {change:+7.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit pages.")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="Concurrent session counts to sweep (default: 1 2 4 8)")
+    parser.add_argument('--interactions', type=int, default=10,
+                        help="Random widget changes per session (default: 10)")
+    parser.add_argument('--pages', nargs='+', choices=sorted(PAGES), default=['dashboard', 'eda'])
+    parser.add_argument('--data-dir', help="Folder with the three CSVs (default: generate synthetic data)")
+    parser.add_argument('--symbols', type=int, default=500, help="Synthetic dataset symbols")
+    parser.add_argument('--days', type=int, default=1000, help="Synthetic dataset trading days")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=120, help="Per-rerun timeout in seconds")
+    parser.add_argument('--full-reruns', action='store_true',
+                        help="Rerun the whole script on every change, even for widgets inside st.fragment")
+    parser.add_argument('--output', default='load_test_results.json', help="Where to write the JSON results")
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.data_dir:
+        data_dir = args.data_dir
+    else:
+        data_dir = os.path.join(tempfile.gettempdir(), f"sp500_synthetic_{args.symbols}x{args.days}_{args.seed}")
+        if not os.path.exists(os.path.join(data_dir, "sp500_stocks.csv")):
+            print(f"🧪 Generating synthetic dataset ({args.symbols} symbols × {args.days} days)...")
+            make_synthetic_dataset(data_dir, args.symbols, args.days, args.seed)
+    os.environ["SP500_DATA_DIR"] = data_dir
+
+    # Page scripts import load_data from the repo root
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    levels = []
+    with install_shared_runtime():
+        # Warm the shared data cache once so every level measures steady-state reruns
+        print("🔥 Warming data cache...")
+        for page in args.pages:
+            run_session(page, 0, args.seed, args.timeout)
+
+        for n in args.sessions:
+            print(f"🚦 Running {n} concurrent session(s)...")
+            levels.append(run_level(
+                n, args.pages, args.interactions, args.seed, args.timeout, not args.full_reruns
+            ))
+            if levels[-1].get('first_error'):
+                print(f"⚠️  First error: {levels[-1]['first_error']}")
+
+    results = {
+        'meta': {
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'data_dir': data_dir,
+            'pages': args.pages,
+            'interactions': args.interactions,
+            'seed': args.seed,
+            'fragment_reruns': not args.full_reruns,
+        },
+        'levels': levels,
+    }
+
+    print()
+    print_curve(levels, baseline)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Monte Carlo simulation of future portfolio paths.
+
+Daily log returns for the chosen symbols are taken from the cached
+'Adj Close' matrix over a lookback window. Future days are then drawn
+either by bootstrapping whole historical days (keeps fat tails and the
+cross-sectional correlation of that day) or from a multivariate normal
+with the historical mean and covariance.
+
+Everything is vectorized over paths: one chunk draws a
+(paths x days x symbols) block, cumulates it per symbol and collapses it to
+a buy-and-hold portfolio value with one matmul. Chunks keep memory bounded
+and can be spread over a process pool; each chunk gets its own seed from a
+SeedSequence, so results depend on the seed and chunk size but not on how
+many processes ran them.
+
+Works without Streamlit:
+
+    from monte_carlo import historical_returns, simulate_portfolio, var_cvar
+    returns = historical_returns(prices, ['AAPL', 'MSFT'], lookback_days=756)
+    paths = simulate_portfolio(returns, [0.5, 0.5], n_paths=10_000, horizon=252)
+    var, cvar = var_cvar(paths[:, -1] - 1, level=0.95)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from load_data import get_sp500_data, get_dataset_snapshot
+from disk_cache import disk_cache
+from price_matrix import get_price_matrix
+from instrumentation import timed_stage
+from jobs import report_progress
+
+METHODS = {'bootstrap': 'Historical bootstrap', 'normal': 'Multivariate normal'}
+
+FAN_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Paths per chunk: 1,000 paths x 252 days x 50 symbols is ~50 MB of float32
+CHUNK_PATHS = 1_000
+
+
+def historical_returns(prices, symbols, lookback_days=756):
+    """
+    Daily log returns (Date x Symbol) of the given symbols over the last
+    lookback_days rows of a price matrix. Days where any symbol lacks a
+    price are dropped, so every row is a complete cross-section.
+    """
+    window = prices[list(symbols)].iloc[-(lookback_days + 1):]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_returns = np.log(window).diff().iloc[1:]
+    return log_returns.replace([np.inf, -np.inf], np.nan).dropna()
+
+
+def _simulate_chunk(returns, weights, n_paths, horizon, method, seed):
+    """
+    Portfolio value paths (n_paths x horizon+1, starting at 1) for one chunk.
+    """
+    rng = np.random.default_rng(seed)
+    n_days, n_symbols = returns.shape
+
+    if method == 'bootstrap':
+        days = rng.integers(0, n_days, size=(n_paths, horizon))
+        draws = returns.astype(np.float32)[days]
+    elif method == 'normal':
+        mean = returns.mean(axis=0)
+        cov = np.atleast_2d(np.cov(returns, rowvar=False))
+        # Small jitter keeps Cholesky stable for near-duplicate symbols
+        chol = np.linalg.cholesky(cov + np.eye(n_symbols) * 1e-12)
+        shocks = rng.standard_normal((n_paths, horizon, n_symbols), dtype=np.float32)
+        draws = shocks @ chol.T.astype(np.float32) + mean.astype(np.float32)
+    else:
+        raise ValueError(f"Unknown method '{method}', expected one of {list(METHODS)}")
+
+    # Buy and hold: each symbol's growth compounds separately, then weights apply
+    np.cumsum(draws, axis=1, out=draws)
+    np.exp(draws, out=draws)
+    values = draws @ weights.astype(np.float32)
+
+    paths = np.empty((n_paths, horizon + 1))
+    paths[:, 0] = 1.0
+    paths[:, 1:] = values
+    return paths
+
+
+def simulate_portfolio(returns, weights, n_paths=10_000, horizon=252, method='bootstrap',
+                       seed=0, chunk_paths=CHUNK_PATHS, processes=None):
+    """
+    Simulates n_paths portfolio value paths over horizon trading days.
+
+    returns: Date x Symbol log returns (see historical_returns).
+    weights: initial portfolio weights, normalized to sum to 1.
+    processes: run chunks in a process pool of this size (None/1 = in-process).
+
+    Returns an (n_paths x horizon+1) array of portfolio values starting at 1.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum()
+    if len(returns) < 2:
+        raise ValueError("Need at least 2 days of complete returns to simulate")
+
+    sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(returns, weights, size, horizon, method, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    chunks = []
+    if processes and processes > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for chunk in pool.map(_simulate_chunk, *zip(*args)):
+                chunks.append(chunk)
+                report_progress(len(chunks) / len(args), f"{len(chunks)} of {len(args)} chunks")
+    else:
+        for chunk_args in args:
+            chunks.append(_simulate_chunk(*chunk_args))
+            report_progress(len(chunks) / len(args), f"{len(chunks)} of {len(args)} chunks")
+
+    return np.concatenate(chunks)
+
+
+def fan_chart(paths, percentiles=FAN_PERCENTILES):
+    """
+    Percentile bands of the paths per day (day x percentile DataFrame).
+    """
+    bands = np.percentile(paths, percentiles, axis=0).T
+    return pd.DataFrame(bands, columns=[f'P{p}' for p in percentiles]).rename_axis('Day')
+
+
+def var_cvar(pnl, level=0.95):
+    """
+    Value at Risk and Conditional VaR (expected shortfall) at a confidence
+    level, as positive loss fractions of the starting value.
+    """
+    pnl = np.asarray(pnl)
+    threshold = np.quantile(pnl, 1 - level)
+    tail = pnl[pnl <= threshold]
+    return -threshold, -tail.mean()
+
+
+def summarize(paths, levels=(0.95, 0.99)):
+    """
+    Terminal-value statistics: percentiles, probability of loss, VaR/CVaR.
+    """
+    terminal = paths[:, -1] - 1
+    summary = {
+        'Mean Return': terminal.mean(),
+        'Median Return': np.median(terminal),
+        'Probability of Loss': (terminal < 0).mean(),
+    }
+    for level in levels:
+        var, cvar = var_cvar(terminal, level)
+        summary[f'VaR {level:.0%}'] = var
+        summary[f'CVaR {level:.0%}'] = cvar
+    return summary
+
+
+@st.cache_data(ttl=86400, max_entries=32)
+def get_historical_returns(symbols, lookback_days=756):
+    """
+    Log returns for a tuple of symbols from the cached 'Adj Close' matrix.
+    """
+    return historical_returns(get_price_matrix('Adj Close'), symbols, lookback_days)
+
+
+@st.cache_data(ttl=86400, max_entries=16)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_simulation(symbols, weights, n_paths, horizon, method, lookback_days, seed=0):
+    """
+    Cached simulation for one set of settings: (fan chart, summary, terminal returns).
+    The full path array is not cached, only what the page draws.
+    """
+    returns = get_historical_returns(symbols, lookback_days)
+    with timed_stage("monte_carlo.simulate") as stage:
+        paths = simulate_portfolio(returns, weights, n_paths, horizon, method, seed)
+        stage.rows = n_paths * horizon * len(symbols)
+    return fan_chart(paths), summarize(paths), paths[:, -1] - 1
+
+
+@st.cache_data(ttl=86400)
+def get_marketcaps():
+    companies_df, _, _ = get_sp500_data()
+    return companies_df.drop_duplicates('Symbol').set_index('Symbol')['Marketcap']
@@ -1,9 +1,12 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from load_data import get_sp500_data
-import numpy as np
+from computations import named_exchanges, get_filter_options, get_volatility, get_revenue_growth
+from indices import WEIGHTINGS, get_indices, rebase
+from clustering import METHODS as CLUSTER_METHODS, get_clusters
+from figures import EXCHANGE_COLORS, index_lines, volatility_scatter, revenue_growth_box, return_distribution_box
+from box_stats import get_return_box_stats
+from price_modes import PRICE_MODES, PRICE_MODE_LABELS, PRICE_MODE_HELP
+from jobs import job_result
+from instrumentation import timed_stage, render_debug_panel
 
 # Page config
 st.set_page_config(page_title="EDA Gallery", page_icon="📊", layout="wide")
@@ -11,11 +14,41 @@ st.set_page_config(page_title="EDA Gallery", page_icon="📊", layout="wide")
 st.title("📊 Exploratory Data Analysis Gallery")
 st.markdown("### Exploring S&P 500 Data Through 4 Different Visualization Types")
 
-# Load data
-companies_df, stocks_df, index_df = get_sp500_data()
-
 st.markdown("---")
 
+# Each chart reads a cached, precomputed table (see computations.py and
+# indices.py), so a rerun only rebuilds figures. Charts 1 and 2 are
+# st.fragments: changing their weighting, base date or sector focus reruns
+# just that chart, not the whole page. Chart 3's price mode and colouring work the same way.
+
+with timed_stage("eda.filter_options"):
+    min_date, max_date, _, _ = get_filter_options()
+
+
+def index_controls(key):
+    """
+    Weighting radio + base date picker shared by the two index charts.
+    """
+    col1, col2 = st.columns(2)
+    with col1:
+        weighting = st.radio(
+            "Weighting:",
+            options=list(WEIGHTINGS),
+            format_func=WEIGHTINGS.get,
+            horizontal=True,
+            key=f"{key}_weighting"
+        )
+    with col2:
+        base_date = st.date_input(
+            "Rebase to 100 on:",
+            value=min_date,
+            min_value=min_date,
+            max_value=max_date,
+            key=f"{key}_base_date"
+        )
+    return weighting, base_date
+
+
 # ====================
 # CHART 1: Exchange Performance Over Time (Line Chart)
 # ====================
@@ -23,38 +56,45 @@ st.markdown("---")
 st.header("1️⃣ Exchange Performance: NYSE vs NASDAQ")
 st.markdown("**Question:** How have the 2 US exchanges (NYSE & NASDAQ) performed against each other over time?")
 
-# Merge stocks with companies to get exchange info
-stocks_with_exchange = stocks_df.merge(companies_df[['Symbol', 'Exchange']], on='Symbol', how='left')
+@st.fragment
+def exchange_chart():
+    """
+    NYSE vs NASDAQ total-return indices, rebased to the chosen date.
+    """
+    weighting, base_date = index_controls("exchange")
 
-# Calculate average closing price by exchange and date
-exchange_performance = stocks_with_exchange.groupby(['Date', 'Exchange'])['Close'].mean().reset_index()
+    # Precomputed index levels (cached), rebased with one division
+    with timed_stage("eda.chart1.data") as stage:
+        levels = named_exchanges(get_indices('Exchange', weighting))
+        exchange_index = rebase(levels, base_date)
+        stage.rows = exchange_index.size
 
-# Filter for NYSE (NYQ) and NASDAQ (NMS) only
-exchange_performance = exchange_performance[exchange_performance['Exchange'].isin(['NYQ', 'NMS'])]
+    if levels.empty:
+        st.info("ℹ️ This data release has no NYSE or NASDAQ constituents to compare.")
+        return
 
-# Rename for clarity
-exchange_performance['Exchange'] = exchange_performance['Exchange'].map({'NYQ': 'NYSE', 'NMS': 'NASDAQ'})
+    # Create interactive line chart
+    with timed_stage("eda.chart1.figure", rows=exchange_index.size):
+        fig1 = index_lines(
+            exchange_index,
+            f'{WEIGHTINGS[weighting]} Total-Return Index: NYSE vs NASDAQ',
+            base_date,
+            color_discrete_map=EXCHANGE_COLORS
+        )
 
-# Create interactive line chart
-fig1 = px.line(
-    exchange_performance, 
-    x='Date', 
-    y='Close', 
-    color='Exchange',
-    title='Average Stock Price Performance: NYSE vs NASDAQ',
-    labels={'Close': 'Average Closing Price ($)', 'Date': 'Date'},
-    color_discrete_map={'NYSE': '#1f77b4', 'NASDAQ': '#ff7f0e'}
-)
+    with timed_stage("eda.chart1.render"):
+        st.plotly_chart(fig1, width='stretch')
 
-fig1.update_layout(hovermode='x unified', height=500)
-st.plotly_chart(fig1, width='stretch')
+exchange_chart()
 
 # How to read this chart
 with st.expander("📖 How to Read This Chart"):
     st.markdown("""
     - **X-axis:** Time (date range of the dataset)
-    - **Y-axis:** Average closing price in dollars across all stocks on each exchange
+    - **Y-axis:** Total-return index level, set to 100 on the chosen base date (110 = +10% since then, dividends included)
     - **Lines:** Blue line represents NYSE, orange line represents NASDAQ
+    - **Weighting:** Cap-weighted gives bigger companies more influence (like the S&P 500 itself);
+      equal-weighted treats every stock the same
     - **Hover:** Move your cursor over the chart to see exact values for each date
     - **Interpretation:** Compare the trajectories to see which exchange's stocks performed better over time
     """)
@@ -62,11 +102,11 @@ with st.expander("📖 How to Read This Chart"):
 # Observations
 with st.expander("🔍 Key Observations"):
     st.markdown("""
-    - **NASDAQ stocks show higher average prices** overall compared to NYSE stocks, likely due to the 
-      concentration of high-growth technology companies on NASDAQ.
     - **Both exchanges follow similar trends**, indicating they respond to overall market conditions together.
-    - **Price divergence varies over time** - the gap between exchanges widens and narrows based on 
+    - **Performance divergence varies over time** - the gap between exchanges widens and narrows based on
       sector performance (tech vs traditional industries).
+    - **Cap-weighted vs equal-weighted** shows how much of an exchange's return comes from its largest
+      companies: a cap-weighted line well above the equal-weighted one means the giants led.
     - **Volatility appears similar** between both exchanges, with comparable peaks and troughs.
     """)
 
@@ -79,52 +119,58 @@ st.markdown("---")
 st.header("2️⃣ Sector Performance Trends")
 st.markdown("**Question:** How have different sectors of the S&P 500 stocks performed over the last few years?")
 
-# Merge stocks with sector information
-stocks_with_sector = stocks_df.merge(companies_df[['Symbol', 'Sector']], on='Symbol', how='left')
-
-# Calculate average closing price by sector and date
-sector_performance = stocks_with_sector.groupby(['Date', 'Sector'])['Close'].mean().reset_index()
-
-# Create interactive multi-line chart
-fig2 = px.line(
-    sector_performance,
-    x='Date',
-    y='Close',
-    color='Sector',
-    title='Stock Performance by Sector Over Time',
-    labels={'Close': 'Average Closing Price ($)', 'Date': 'Date'}
-)
-
-fig2.update_layout(hovermode='x unified', height=600)
-st.plotly_chart(fig2, width='stretch')
+@st.fragment
+def sector_chart():
+    """
+    Total-return index per sector plus the focus comparison below it.
+    """
+    weighting, base_date = index_controls("sector")
+
+    # Precomputed index levels (cached), rebased with one division
+    with timed_stage("eda.chart2.data") as stage:
+        sector_index = rebase(get_indices('Sector', weighting), base_date)
+        stage.rows = sector_index.size
+
+    # Create interactive multi-line chart
+    with timed_stage("eda.chart2.figure", rows=sector_index.size):
+        fig2 = index_lines(
+            sector_index,
+            f'{WEIGHTINGS[weighting]} Total-Return Index by Sector',
+            base_date,
+            height=600
+        )
+
+    with timed_stage("eda.chart2.render"):
+        st.plotly_chart(fig2, width='stretch')
+
+    # Sector selector for detailed view
+    st.markdown("#### 🔎 Focus on Specific Sectors")
+    selected_sectors = st.multiselect(
+        "Select sectors to compare:",
+        options=list(sector_index.columns),
+        default=[s for s in ['Technology', 'Financial Services', 'Healthcare'] if s in sector_index.columns]
+    )
 
-# Sector selector for detailed view
-st.markdown("#### 🔎 Focus on Specific Sectors")
-selected_sectors = st.multiselect(
-    "Select sectors to compare:",
-    options=sector_performance['Sector'].unique(),
-    default=['Technology', 'Financial Services', 'Healthcare']
-)
+    if selected_sectors:
+        with timed_stage("eda.chart2.focus", rows=sector_index.size):
+            fig2_filtered = index_lines(
+                sector_index[selected_sectors],
+                f'Comparison: {", ".join(selected_sectors)}',
+                base_date,
+                height=400
+            )
+            st.plotly_chart(fig2_filtered, width='stretch')
 
-if selected_sectors:
-    filtered_sector = sector_performance[sector_performance['Sector'].isin(selected_sectors)]
-    fig2_filtered = px.line(
-        filtered_sector,
-        x='Date',
-        y='Close',
-        color='Sector',
-        title=f'Comparison: {", ".join(selected_sectors)}',
-        labels={'Close': 'Average Closing Price ($)', 'Date': 'Date'}
-    )
-    fig2_filtered.update_layout(hovermode='x unified', height=400)
-    st.plotly_chart(fig2_filtered, width='stretch')
+sector_chart()
 
 # How to read this chart
 with st.expander("📖 How to Read This Chart"):
     st.markdown("""
     - **X-axis:** Time period covered by the dataset
-    - **Y-axis:** Average closing price for stocks in each sector
+    - **Y-axis:** Total-return index level for each sector, set to 100 on the chosen base date
     - **Multiple lines:** Each colored line represents a different sector (11 total sectors in S&P 500)
+    - **Weighting and base date:** Switch between cap- and equal-weighted indices, or move the base date
+      to compare sector returns from any starting point
     - **Interactive filter:** Use the multiselect above to focus on specific sectors for clearer comparison
     - **Hover:** See exact sector names and values by hovering over the lines
     """)
@@ -132,11 +178,11 @@ with st.expander("📖 How to Read This Chart"):
 # Observations
 with st.expander("🔍 Key Observations"):
     st.markdown("""
-    - **Technology sector shows highest growth trajectory**, with average prices significantly above other sectors,
-      driven by major tech companies like Apple, Microsoft, and Google.
+    - **Technology sector shows highest growth trajectory**, driven by major tech companies like Apple,
+      Microsoft, and Google - especially in the cap-weighted index, where those giants dominate.
     - **Consumer Discretionary follows a similar upward trend** to Technology, reflecting strong consumer spending.
     - **Utilities and Real Estate show more stable, lower-volatility performance** - these defensive sectors
-      have lower average prices but steadier returns.
+      have flatter index lines with steadier returns.
     - **Financials experienced notable fluctuations**, particularly sensitive to interest rate changes and 
       economic cycles.
     - **Energy sector shows high volatility**, likely due to oil price fluctuations and geopolitical factors.
@@ -153,62 +199,71 @@ st.markdown("---")
 st.header("3️⃣ Market Capitalization vs Stock Volatility")
 st.markdown("**Question:** What is the relationship between a company's market capitalization and its stock price volatility?")
 
-# Cache the volatility calculation to avoid recalculating every time
-@st.cache_data
-def calculate_volatility(stocks_df, companies_df):
+LOOKBACKS = {63: '3 months', 126: '6 months', 252: '1 year', 504: '2 years', 756: '3 years'}
+
+@st.fragment
+def volatility_chart():
     """
-    Optimized volatility calculation using vectorized operations.
+    Scatter coloured by stated sector or by return-based cluster. The price
+    mode and cluster settings only rerun this chart.
     """
-    # Sort by symbol and date
-    stocks_sorted = stocks_df.sort_values(['Symbol', 'Date']).copy()
-    
-    # Calculate returns for all stocks at once (vectorized)
-    stocks_sorted['Returns'] = stocks_sorted.groupby('Symbol')['Close'].pct_change(fill_method=None)
-    
-    # Calculate volatility (std of returns) for each symbol
-    volatility_series = stocks_sorted.groupby('Symbol')['Returns'].std()
-    
-    # Create dataframe with volatility
-    volatility_df = volatility_series.reset_index()
-    volatility_df.columns = ['Symbol', 'Volatility']
-    
-    # Merge with company data
-    volatility_df = volatility_df.merge(
-        companies_df[['Symbol', 'Marketcap', 'Sector', 'Shortname']], 
-        on='Symbol', 
-        how='left'
+    price_mode = st.radio(
+        "Volatility from:",
+        options=list(PRICE_MODES),
+        format_func=PRICE_MODE_LABELS.get,
+        horizontal=True,
+        help=PRICE_MODE_HELP
     )
-    
-    # Remove missing values
-    volatility_df = volatility_df.dropna()
-    
-    return volatility_df
-
-# Calculate volatility (cached - only runs once)
-volatility_df = calculate_volatility(stocks_df, companies_df)
-
-# Create scatter plot (no trend line - cleaner visualization)
-fig3 = px.scatter(
-    volatility_df,
-    x='Marketcap',
-    y='Volatility',
-    color='Sector',
-    hover_data=['Symbol', 'Shortname'],
-    title='Market Capitalization vs Stock Price Volatility',
-    labels={'Marketcap': 'Market Capitalization ($)', 'Volatility': 'Volatility (Std Dev of Returns)'},
-    log_x=True  # Log scale for better visualization
-)
 
-fig3.update_layout(height=600, hovermode='closest')
-st.plotly_chart(fig3, width='stretch')
+    # Volatility per company (cached per price mode, see computations.calculate_volatility);
+    # a cold computation runs as a background job and fills the chart in when done
+    with timed_stage("eda.chart3.volatility") as stage:
+        volatility_df = job_result(get_volatility, price_mode, label="Computing volatility")
+        if volatility_df is None:
+            return
+        stage.rows = len(volatility_df)
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        color_by = st.radio("Colour by:", options=['Sector', 'Return cluster'], horizontal=True)
+
+    plot_df, color, category_orders = volatility_df, 'Sector', None
+    if color_by == 'Return cluster':
+        with col2:
+            method = st.selectbox("Clustering method:", options=list(CLUSTER_METHODS), format_func=CLUSTER_METHODS.get)
+        with col3:
+            n_clusters = st.slider("Number of clusters:", min_value=2, max_value=15, value=8)
+        with col4:
+            lookback_days = st.select_slider(
+                "Returns over the last:", options=list(LOOKBACKS), value=252, format_func=LOOKBACKS.get
+            )
+
+        # Cluster assignments (cached per window, setting and price mode, see clustering.py)
+        with timed_stage("eda.chart3.clusters"):
+            clusters = get_clusters(lookback_days, method, n_clusters, price_mode)
+            plot_df = volatility_df.merge(clusters.reset_index(), on='Symbol', how='left')
+            plot_df['Cluster'] = plot_df['Cluster'].fillna('Unclustered')
+        color = 'Cluster'
+        category_orders = {'Cluster': [f'Cluster {i + 1}' for i in range(n_clusters)] + ['Unclustered']}
+
+    # Create scatter plot
+    with timed_stage("eda.chart3.figure", rows=len(plot_df)):
+        fig3 = volatility_scatter(plot_df, color, category_orders)
+
+    with timed_stage("eda.chart3.render"):
+        st.plotly_chart(fig3, width='stretch')
+
+volatility_chart()
 
 # How to read this chart
 with st.expander("📖 How to Read This Chart"):
     st.markdown("""
     - **X-axis:** Market capitalization (company size) on a logarithmic scale
-    - **Y-axis:** Volatility measured as standard deviation of daily returns
+    - **Y-axis:** Volatility measured as standard deviation of daily returns, from raw closes, split-adjusted
+      closes or total-return prices (an unadjusted split shows up as one huge "return" in raw prices)
     - **Points:** Each dot represents one company
-    - **Colors:** Different sectors are color-coded
+    - **Colors:** Different sectors are color-coded, or switch to **Return cluster** to colour companies by
+      how their stock actually trades (groups of stocks whose daily returns move together over the chosen window)
     - **Log scale:** X-axis uses logarithmic scale to better display the wide range of market caps
     - **Hover:** Click on points to see company name, symbol, and exact values
     """)
@@ -242,44 +297,39 @@ show the most consistent growth?
 companies within each sector (snapshot data, not trends over time).*
 """)
 
-# Prepare data - remove missing revenue growth values
-revenue_df = companies_df[['Sector', 'Revenuegrowth', 'Symbol', 'Shortname']].dropna()
+# Box statistics per sector are computed server-side (cached, see box_stats.py),
+# so the chart ships a few numbers per sector plus the outliers, not every company
+revenue_stats, revenue_outliers, summary_stats = get_revenue_growth()
 
 # Create box plot
-fig4 = px.box(
-    revenue_df,
-    x='Sector',
-    y='Revenuegrowth',
-    color='Sector',
-    title='Revenue Growth Distribution by Sector',
-    labels={'Revenuegrowth': 'Revenue Growth Rate', 'Sector': 'Sector'},
-    hover_data=['Symbol', 'Shortname']
-)
-
-fig4.update_layout(
-    height=600,
-    xaxis_tickangle=-45,
-    showlegend=False
-)
+with timed_stage("eda.chart4.figure", rows=len(revenue_stats) + len(revenue_outliers)):
+    fig4 = revenue_growth_box(revenue_stats, revenue_outliers)
 
-fig4.update_yaxes(tickformat='.0%')  # Format as percentage
-
-st.plotly_chart(fig4, width='stretch')
+with timed_stage("eda.chart4.render"):
+    st.plotly_chart(fig4, width='stretch')
 
 # Summary statistics
 st.markdown("#### 📊 Revenue Growth Statistics by Sector")
 
-summary_stats = revenue_df.groupby('Sector')['Revenuegrowth'].agg([
-    ('Median', 'median'),
-    ('Mean', 'mean'),
-    ('Std Dev', 'std'),
-    ('Min', 'min'),
-    ('Max', 'max')
-]).round(4)
-
-summary_stats = summary_stats.sort_values('Median', ascending=False)
 st.dataframe(summary_stats.style.format("{:.2%}"), width='stretch')
 
+# Same chart type over every daily return (millions of values): quartiles come
+# from mergeable quantile sketches, so the figure stays the same size
+st.markdown("#### 📉 Daily Return Distribution by Sector")
+
+with timed_stage("eda.chart4.returns") as stage:
+    return_stats, return_outliers = get_return_box_stats()
+    stage.rows = int(return_stats['Count'].sum())
+
+with timed_stage("eda.chart4.returns_figure", rows=len(return_stats) + len(return_outliers)):
+    fig4_returns = return_distribution_box(return_stats, return_outliers)
+
+st.plotly_chart(fig4_returns, width='stretch')
+st.caption(
+    f"💡 {int(return_stats['Count'].sum()):,} daily returns. Quartiles are accurate to within 1% "
+    "(quantile sketches); the most extreme days per sector are shown as points"
+)
+
 # How to read this chart
 with st.expander("📖 How to Read This Chart"):
     st.markdown("""
@@ -289,6 +339,7 @@ with st.expander("📖 How to Read This Chart"):
     - **Line in box:** The line inside each box is the median revenue growth for that sector
     - **Whiskers:** Extend to show the range of typical values (excluding outliers)
     - **Points beyond whiskers:** Outliers - companies with unusually high or low revenue growth
+      (hover for the company)
     - **Box height:** Taller boxes indicate more variability (less consistent growth) within that sector
     """)
 
@@ -314,3 +365,5 @@ st.markdown("---")
 # Footer
 st.caption("📊 EDA Gallery | S&P 500 Portfolio App")
 st.caption("All charts are interactive - hover, zoom, and filter to explore the data!")
+
+render_debug_panel()
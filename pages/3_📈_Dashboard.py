@@ -1,9 +1,18 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from load_data import get_sp500_data
-from datetime import datetime
+from computations import (
+    get_filter_options, get_kpis, get_sector_correlation, get_exchange_volume, get_filtered_symbols, get_companies
+)
+from clustering import get_clusters
+from figures import (
+    sector_correlation_heatmap, exchange_volume_area, market_cap_treemap as treemap_figure, drawdown_area,
+    sector_episode_bars
+)
+from drawdowns import (
+    DEFAULT_THRESHOLD, drawdown, episode_label, get_index_levels, get_drawdown_episodes, get_episode_stats
+)
+from price_modes import PRICE_MODES, PRICE_MODE_LABELS, PRICE_MODE_HELP
+from instrumentation import timed_stage, render_debug_panel
 
 # Page config
 st.set_page_config(page_title="Dashboard", page_icon="📈", layout="wide")
@@ -11,15 +20,10 @@ st.set_page_config(page_title="Dashboard", page_icon="📈", layout="wide")
 st.title("📈 Interactive S&P 500 Dashboard")
 st.markdown("### Explore stock performance with dynamic filters")
 
-# Load data
-companies_df, stocks_df, index_df = get_sp500_data()
-
-# Merge stocks with company info
-stocks_with_info = stocks_df.merge(
-    companies_df[['Symbol', 'Sector', 'Exchange', 'Shortname']], 
-    on='Symbol', 
-    how='left'
-)
+# Load filter options (date bounds, sectors, exchanges) - a small cached
+# summary, so reruns never copy the full stocks table
+with timed_stage("dashboard.filter_options"):
+    min_date, max_date, all_sectors, all_exchanges = get_filter_options()
 
 st.markdown("---")
 
@@ -31,8 +35,6 @@ st.sidebar.header("🎛️ Dashboard Filters")
 
 # Filter 1: Date Range
 st.sidebar.subheader("1. Date Range")
-min_date = stocks_df['Date'].min().date()
-max_date = stocks_df['Date'].max().date()
 
 date_range = st.sidebar.date_input(
     "Select date range:",
@@ -49,7 +51,6 @@ else:
 
 # Filter 2: Sector Selection
 st.sidebar.subheader("2. Sectors")
-all_sectors = sorted(companies_df['Sector'].dropna().unique())
 selected_sectors = st.sidebar.multiselect(
     "Select sectors to analyze:",
     options=all_sectors,
@@ -59,7 +60,6 @@ selected_sectors = st.sidebar.multiselect(
 # Filter 3: Exchange Selection
 st.sidebar.subheader("3. Exchange")
 exchange_map = {'NYQ': 'NYSE', 'NMS': 'NASDAQ'}
-all_exchanges = sorted(companies_df['Exchange'].dropna().unique())
 exchange_labels = [exchange_map.get(ex, ex) for ex in all_exchanges]
 
 selected_exchange_labels = st.sidebar.multiselect(
@@ -82,6 +82,15 @@ top_n = st.sidebar.slider(
     step=10
 )
 
+# Filter 5: Price series for the KPIs and sector correlation
+st.sidebar.subheader("5. Prices")
+price_mode = st.sidebar.radio(
+    "Compute price metrics from:",
+    options=list(PRICE_MODES),
+    format_func=PRICE_MODE_LABELS.get,
+    help=PRICE_MODE_HELP
+)
+
 st.sidebar.markdown("---")
 st.sidebar.caption("Adjust filters to update dashboard")
 
@@ -89,23 +98,11 @@ st.sidebar.caption("Adjust filters to update dashboard")
 # APPLY FILTERS
 # ====================
 
-# Filter by date
-filtered_stocks = stocks_with_info[
-    (stocks_with_info['Date'] >= pd.to_datetime(start_date)) & 
-    (stocks_with_info['Date'] <= pd.to_datetime(end_date))
-]
-
-# Filter by sector
-if selected_sectors:
-    filtered_stocks = filtered_stocks[filtered_stocks['Sector'].isin(selected_sectors)]
-
-# Filter by exchange
-if selected_exchanges:
-    filtered_stocks = filtered_stocks[filtered_stocks['Exchange'].isin(selected_exchanges)]
-
-# Filter by top N market cap companies
-top_companies = companies_df.nlargest(top_n, 'Marketcap')['Symbol'].tolist()
-filtered_stocks = filtered_stocks[filtered_stocks['Symbol'].isin(top_companies)]
+# Every section below reads a cached result keyed only by the filters it
+# depends on (see computations.py). The merged stocks table and each filtered
+# view are built once and shared, so moving one filter only recomputes the
+# sections whose inputs actually changed.
+filters = (start_date, end_date, tuple(selected_sectors), tuple(selected_exchanges), top_n)
 
 # ====================
 # KEY PERFORMANCE INDICATORS (KPIs)
@@ -113,14 +110,15 @@ filtered_stocks = filtered_stocks[filtered_stocks['Symbol'].isin(top_companies)]
 
 st.header("📊 Key Metrics")
 
-if len(filtered_stocks) > 0:
-    # Calculate KPIs
-    total_companies = filtered_stocks['Symbol'].nunique()
-    avg_price = filtered_stocks['Close'].mean()
-    total_volume = filtered_stocks['Volume'].sum()
-    price_change = filtered_stocks.groupby('Symbol')['Close'].apply(
-        lambda x: ((x.iloc[-1] - x.iloc[0]) / x.iloc[0] * 100) if len(x) > 1 else 0
-    ).mean()
+# Calculate KPIs
+with timed_stage("dashboard.kpis"):
+    kpis = get_kpis(*filters, price_mode)
+
+if kpis is not None:
+    total_companies = kpis['total_companies']
+    avg_price = kpis['avg_price']
+    total_volume = kpis['total_volume']
+    price_change = kpis['price_change']
     
     # Display KPIs in columns
     col1, col2, col3, col4 = st.columns(4)
@@ -166,31 +164,15 @@ st.header("📈 Linked Visualizations")
 
 st.subheader("1. Sector Performance Correlation")
 
-# Create pivot table of daily average prices by sector
-sector_pivot = filtered_stocks.pivot_table(
-    values='Close',
-    index='Date',
-    columns='Sector',
-    aggfunc='mean'
-)
-
-# Calculate correlation matrix
-correlation_matrix = sector_pivot.corr()
+# Correlation of daily average prices by sector
+with timed_stage("dashboard.viz1.data"):
+    correlation_matrix = get_sector_correlation(*filters, price_mode)
 
 # Create heatmap
-fig1 = px.imshow(
-    correlation_matrix,
-    text_auto='.2f',
-    aspect='auto',
-    title='How Do Sectors Move Together?',
-    labels={'color': 'Correlation Coefficient'},
-    color_continuous_scale='RdBu_r',
-    zmin=-1,
-    zmax=1
-)
-
-fig1.update_layout(height=500)
-st.plotly_chart(fig1, width='stretch')
+with timed_stage("dashboard.viz1.figure"):
+    fig1 = sector_correlation_heatmap(correlation_matrix)
+with timed_stage("dashboard.viz1.render"):
+    st.plotly_chart(fig1, width='stretch')
 
 st.caption("💡 Values close to 1 (red) = sectors move together | Values close to -1 (blue) = sectors move oppositely | 0 (white) = no relationship")
 
@@ -201,20 +183,14 @@ st.caption("💡 Values close to 1 (red) = sectors move together | Values close
 st.subheader("2. Trading Volume Distribution by Exchange")
 
 # Aggregate volume by exchange and date
-exchange_volume = filtered_stocks.groupby(['Date', 'Exchange'])['Volume'].sum().reset_index()
-exchange_volume['Exchange'] = exchange_volume['Exchange'].map(exchange_map).fillna(exchange_volume['Exchange'])
-
-fig2 = px.area(
-    exchange_volume,
-    x='Date',
-    y='Volume',
-    color='Exchange',
-    title='Trading Volume Over Time by Exchange',
-    labels={'Volume': 'Total Volume', 'Date': 'Date'}
-)
+with timed_stage("dashboard.viz2.data") as stage:
+    exchange_volume = get_exchange_volume(*filters)
+    stage.rows = len(exchange_volume)
 
-fig2.update_layout(hovermode='x unified', height=500)
-st.plotly_chart(fig2, width='stretch')
+with timed_stage("dashboard.viz2.figure", rows=len(exchange_volume)):
+    fig2 = exchange_volume_area(exchange_volume)
+with timed_stage("dashboard.viz2.render"):
+    st.plotly_chart(fig2, width='stretch')
 
 # ====================
 # VISUALIZATION 3: Market Cap Treemap (NEW)
@@ -222,23 +198,126 @@ st.plotly_chart(fig2, width='stretch')
 
 st.subheader("3. Market Capitalization Distribution")
 
-# Get current market cap for filtered companies
-filtered_companies = companies_df[companies_df['Symbol'].isin(filtered_stocks['Symbol'].unique())]
-
-fig3 = px.treemap(
-    filtered_companies,
-    path=['Sector', 'Symbol'],
-    values='Marketcap',
-    color='Revenuegrowth',
-    hover_data=['Shortname', 'Marketcap'],
-    title='Market Cap Distribution by Sector and Company',
-    color_continuous_scale='RdYlGn',
-    labels={'Revenuegrowth': 'Revenue Growth (%)'}
-)
+@st.fragment
+def market_cap_treemap(filters, price_mode):
+    """
+    Treemap grouped by sector or by return-based cluster. Switching the
+    grouping reruns only this section.
+    """
+    group_by = st.radio(
+        "Group companies by:",
+        options=['Sector', 'Return cluster'],
+        horizontal=True,
+        help="Return clusters group stocks whose daily returns (from the selected prices) moved together over the last year"
+    )
+
+    # Get current market cap for filtered companies
+    with timed_stage("dashboard.viz3.data") as stage:
+        filtered_companies = get_companies(get_filtered_symbols(*filters))
+        stage.rows = len(filtered_companies)
+
+    with timed_stage("dashboard.viz3.figure", rows=len(filtered_companies)):
+        if group_by == 'Sector':
+            fig3 = treemap_figure(filtered_companies)
+            caption = "💡 Box size = Market Cap | Color = Revenue Growth (green = high growth, red = declining) | Click sectors to zoom in!"
+        else:
+            # Cluster assignments for the last year of returns in the selected price mode
+            # (cached, see clustering.py)
+            fig3 = treemap_figure(filtered_companies, get_clusters(252, 'hierarchical', 8, price_mode))
+            caption = "💡 Box size = Market Cap | Color = Return cluster (stocks that trade alike) | Hover to compare with the stated sector"
+    with timed_stage("dashboard.viz3.render"):
+        st.plotly_chart(fig3, width='stretch')
+
+    st.caption(caption)
+
+market_cap_treemap(filters, price_mode)
 
-fig3.update_layout(height=500)
-st.plotly_chart(fig3, width='stretch')
+# ====================
+# VISUALIZATION 4: Market Drawdowns (Event Study)
+# ====================
+
+st.subheader("4. How Did Each Sector Behave in Market Drawdowns?")
+
+@st.fragment
+def drawdown_event_study(selected_sectors):
+    """
+    Major S&P 500 drawdowns and every sector's return, beta and recovery time
+    in the chosen one. Episodes and their statistics are cached, so switching
+    episodes is a lookup.
+    """
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        threshold = st.select_slider(
+            "Minimum index decline:",
+            options=[0.05, 0.10, 0.20, 0.30],
+            value=DEFAULT_THRESHOLD,
+            format_func=lambda value: f"{value:.0%}"
+        )
 
-st.caption("💡 Box size = Market Cap | Color = Revenue Growth (green = high growth, red = declining) | Click sectors to zoom in!")
+    with timed_stage("dashboard.viz4.episodes"):
+        episodes = get_drawdown_episodes(threshold)
+
+    if episodes.empty:
+        st.info(f"ℹ️ The S&P 500 never fell {threshold:.0%} below a previous high in this dataset.")
+        return
+
+    with col2:
+        # Deepest episode first
+        position = st.selectbox(
+            "Episode:",
+            options=list(range(len(episodes))),
+            format_func=lambda i: episode_label(episodes.iloc[i])
+        )
+    episode = episodes.iloc[position]
+
+    with timed_stage("dashboard.viz4.data"):
+        symbol_stats, sector_stats = get_episode_stats(episode['Peak'], episode['Trough'], episode['Recovery'])
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Index Decline", f"{episode['Depth']:.1%}")
+    col2.metric("Trough", f"{episode['Trough']:%Y-%m-%d}", help=f"{episode['Days to Trough']} trading days after the peak")
+    col3.metric(
+        "Index Recovered",
+        f"{episode['Recovery']:%Y-%m-%d}" if pd.notna(episode['Recovery']) else "Not yet",
+        help="First day back at the previous high"
+    )
+    col4.metric(
+        "Trading Days to Recover",
+        f"{episode['Days to Recover']:.0f}" if pd.notna(episode['Days to Recover']) else "-",
+        help="From the trough back to the previous high"
+    )
+
+    with timed_stage("dashboard.viz4.figure", rows=len(sector_stats)):
+        fig4 = drawdown_area(drawdown(get_index_levels()), episode)
+        fig5 = sector_episode_bars(sector_stats)
+    st.plotly_chart(fig4, width='stretch')
+    st.plotly_chart(fig5, width='stretch')
+
+    st.dataframe(
+        sector_stats.style.format({
+            'Drawdown Return': '{:.1%}', 'Recovery Return': '{:.1%}', 'Median Beta': '{:.2f}',
+            'Recovered': '{:.0%}', 'Median Days to Recover': '{:.0f}'
+        }, na_rep='-'),
+        width='stretch'
+    )
+
+    with st.expander("🏢 Companies in the selected sectors"):
+        companies = symbol_stats[symbol_stats['Sector'].isin(selected_sectors)] if selected_sectors else symbol_stats
+        st.dataframe(
+            companies.sort_values('Drawdown Return').style.format({
+                'Drawdown Return': '{:.1%}', 'Recovery Return': '{:.1%}', 'Beta': '{:.2f}', 'Days to Recover': '{:.0f}'
+            }, na_rep='-'),
+            width='stretch'
+        )
+
+drawdown_event_study(tuple(selected_sectors))
+
+st.caption(
+    "💡 Drawdown Return = peak to trough, Recovery Return = trough to the index's recovery (total return, "
+    "dividends included) | Beta > 1 = fell harder than the market | Days to Recover = trading days after the "
+    "trough until the stock was back at its peak price. Covers all sectors; the company table follows the sidebar."
+)
 
 st.markdown("---")
+
+render_debug_panel()
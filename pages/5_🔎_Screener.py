@@ -0,0 +1,162 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import time
+from computations import get_filter_options
+from screener import METRICS, get_screener_metrics, get_company_info, leaderboard, with_company_info
+from price_modes import PRICE_MODES, PRICE_MODE_LABELS, PRICE_MODE_HELP
+from instrumentation import timed_stage, render_debug_panel
+
+# Page config
+st.set_page_config(page_title="Screener", page_icon="🔎", layout="wide")
+
+st.title("🔎 Top Movers Screener")
+st.markdown("### Rank every S&P 500 stock by a metric over any window")
+
+with timed_stage("screener.filter_options"):
+    min_date, max_date, all_sectors, _ = get_filter_options()
+
+st.markdown("---")
+
+# ====================
+# SIDEBAR FILTERS
+# ====================
+
+st.sidebar.header("🎛️ Screener Settings")
+
+# Setting 1: Window
+st.sidebar.subheader("1. Date Range")
+default_start = max(min_date, (pd.Timestamp(max_date) - pd.DateOffset(years=1)).date())
+date_range = st.sidebar.date_input(
+    "Select date range:",
+    value=(default_start, max_date),
+    min_value=min_date,
+    max_value=max_date
+)
+
+# Handle single date selection
+if len(date_range) == 2:
+    start_date, end_date = date_range
+else:
+    start_date = end_date = date_range[0]
+
+# Setting 2: Metric
+st.sidebar.subheader("2. Metric")
+metric = st.sidebar.selectbox(
+    "Rank companies by:",
+    options=list(METRICS),
+    format_func=METRICS.get
+)
+
+# Setting 3: Leaderboard size
+st.sidebar.subheader("3. Leaderboard Size")
+k = st.sidebar.slider("Show top/bottom K:", min_value=5, max_value=50, value=10, step=5)
+
+# Setting 4: Optional sector restriction
+st.sidebar.subheader("4. Sectors (optional)")
+selected_sectors = st.sidebar.multiselect("Limit to sectors:", options=all_sectors)
+
+# Setting 5: Price series
+st.sidebar.subheader("5. Prices")
+price_mode = st.sidebar.radio(
+    "Compute metrics from:",
+    options=list(PRICE_MODES),
+    format_func=PRICE_MODE_LABELS.get,
+    help=PRICE_MODE_HELP
+)
+
+st.sidebar.markdown("---")
+st.sidebar.caption("Metrics are computed once per date range and price mode; changing metric, K or sectors only re-ranks")
+
+# ====================
+# RANKING
+# ====================
+
+# Metric table for the window (cached per date range)
+with timed_stage("screener.metrics_lookup"):
+    metrics = get_screener_metrics(start_date, end_date, price_mode)
+    company_info = get_company_info()
+
+if metrics.isna().all().all():
+    st.info(f"ℹ️ No trading days between {start_date} and {end_date}. Pick a window that includes a trading day.")
+    render_debug_panel()
+    st.stop()
+
+if selected_sectors:
+    in_sectors = company_info.loc[company_info['Sector'].isin(selected_sectors), 'Symbol']
+    metrics = metrics[metrics.index.isin(in_sectors)]
+
+t0 = time.perf_counter()
+with timed_stage("screener.rank", rows=len(metrics)):
+    top, bottom = leaderboard(metrics, metric, k)
+rank_ms = (time.perf_counter() - t0) * 1000
+
+st.caption(f"Ranked {len(metrics):,} symbols by {METRICS[metric]} in {rank_ms:.1f} ms")
+
+percent_metrics = {'period_return', 'volatility', 'max_drawdown', 'from_52w_high'}
+
+def format_board(board):
+    """
+    Leaderboard table with company names and readable numbers.
+    """
+    board = with_company_info(board, company_info)
+    board = board[['Shortname', 'Sector'] + list(METRICS)].rename(columns=METRICS)
+    formats = {
+        label: ("{:.2%}" if key in percent_metrics else "{:.2f}x")
+        for key, label in METRICS.items()
+    }
+    return board.style.format(formats, na_rep="-")
+
+col1, col2 = st.columns(2)
+
+with col1:
+    st.subheader(f"⬆️ Top {len(top)}")
+    st.dataframe(format_board(top), width='stretch')
+
+with col2:
+    st.subheader(f"⬇️ Bottom {len(bottom)}")
+    st.dataframe(format_board(bottom), width='stretch')
+
+# ====================
+# VISUALIZATION
+# ====================
+
+st.subheader(f"📊 {METRICS[metric]}: Leaders and Laggards")
+
+with timed_stage("screener.figure"):
+    chart_df = pd.concat([top.assign(Group='Top'), bottom.assign(Group='Bottom')])
+    chart_df = chart_df[~chart_df.index.duplicated()].reset_index()
+
+    fig = px.bar(
+        chart_df.sort_values(metric),
+        x=metric,
+        y='Symbol',
+        color='Group',
+        orientation='h',
+        title=f'{METRICS[metric]} from {start_date} to {end_date}',
+        labels={metric: METRICS[metric], 'Symbol': 'Symbol'},
+        color_discrete_map={'Top': '#1f77b4', 'Bottom': '#ff7f0e'}
+    )
+    if metric in percent_metrics:
+        fig.update_xaxes(tickformat='.0%')
+    fig.update_layout(height=max(400, 22 * len(chart_df)))
+
+st.plotly_chart(fig, width='stretch')
+
+# How to read this page
+with st.expander("📖 How to Read This Page"):
+    st.markdown("""
+    - **Period Return:** Change from the first to the last close in the selected window
+    - **Volatility:** Standard deviation of daily returns, annualized (× √252)
+    - **Volume Surge:** Average volume over the last 20 trading days divided by the window average (above 1x = unusually active)
+    - **Max Drawdown:** Largest peak-to-trough fall inside the window
+    - **Distance from 52-Week High:** Last close relative to the highest close in the trailing 252 trading days
+    - **Top/Bottom:** Highest and lowest values of the chosen metric; companies without enough data are skipped
+    """)
+
+st.markdown("---")
+
+# Footer
+st.caption("🔎 Screener | S&P 500 Portfolio App")
+
+render_debug_panel()
@@ -0,0 +1,212 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import time
+from monte_carlo import METHODS, FAN_PERCENTILES, get_simulation, get_marketcaps
+from load_data import get_data_quality
+from jobs import job_result
+from instrumentation import timed_stage, render_debug_panel
+
+# Page config
+st.set_page_config(page_title="Monte Carlo", page_icon="🎲", layout="wide")
+
+st.title("🎲 Monte Carlo Portfolio Simulation")
+st.markdown("### Thousands of possible futures for a portfolio of S&P 500 stocks")
+
+with timed_stage("monte_carlo.marketcaps"):
+    marketcaps = get_marketcaps().dropna().sort_values(ascending=False)
+
+st.markdown("---")
+
+# ====================
+# SIDEBAR SETTINGS
+# ====================
+
+st.sidebar.header("🎛️ Simulation Settings")
+
+# Setting 1: Portfolio
+st.sidebar.subheader("1. Portfolio")
+symbols = st.sidebar.multiselect(
+    "Select stocks:",
+    options=list(marketcaps.index),
+    default=list(marketcaps.index[:10])
+)
+weighting = st.sidebar.radio(
+    "Weighting:",
+    options=['Equal', 'Market Cap'],
+    horizontal=True
+)
+
+# Setting 2: Model
+st.sidebar.subheader("2. Return Model")
+method = st.sidebar.selectbox(
+    "Simulate daily returns by:",
+    options=list(METHODS),
+    format_func=METHODS.get
+)
+lookback_years = st.sidebar.select_slider(
+    "Estimate from the last:",
+    options=[1, 2, 3, 5],
+    value=3,
+    format_func=lambda years: f"{years} year{'s' if years > 1 else ''}"
+)
+
+# Setting 3: Simulation size
+st.sidebar.subheader("3. Simulation")
+horizon = st.sidebar.slider("Horizon (trading days):", min_value=21, max_value=756, value=252, step=21)
+n_paths = st.sidebar.select_slider("Number of paths:", options=[1_000, 5_000, 10_000, 20_000], value=10_000)
+initial_value = st.sidebar.number_input("Initial investment ($):", min_value=1_000, value=10_000, step=1_000)
+
+st.sidebar.markdown("---")
+st.sidebar.caption("Results are cached per setting combination; changing the investment amount only rescales")
+
+if not symbols:
+    st.warning("⚠️ Select at least one stock to simulate.")
+    render_debug_panel()
+    st.stop()
+
+symbols = tuple(symbols)
+if weighting == 'Equal':
+    weights = tuple([1.0 / len(symbols)] * len(symbols))
+else:
+    caps = marketcaps.loc[list(symbols)]
+    weights = tuple((caps / caps.sum()).tolist())
+
+# ====================
+# SIMULATION
+# ====================
+
+# Only days where every selected stock traded are used, so late listings
+# shorten the estimation window (first valid dates come from the loader)
+_, symbol_ranges = get_data_quality()
+first_valid = symbol_ranges.loc[list(symbols), 'First Valid Date']
+lookback_start = symbol_ranges['Last Valid Date'].max() - pd.DateOffset(years=lookback_years)
+late_listings = first_valid[first_valid > lookback_start]
+if not late_listings.empty:
+    st.info(
+        "ℹ️ Listed after the start of the lookback window, so returns are estimated from "
+        f"{late_listings.max():%Y-%m-%d} onwards: "
+        + ", ".join(f"{symbol} ({date:%Y-%m-%d})" for symbol, date in late_listings.items())
+    )
+
+# New settings simulate in a background job: the page shows its progress and
+# stays responsive, and other sessions asking for the same run share the job
+t0 = time.perf_counter()
+try:
+    simulation = job_result(
+        get_simulation, symbols, weights, n_paths, horizon, method, lookback_years * 252,
+        label=f"Simulating {n_paths:,} paths"
+    )
+except ValueError as error:
+    st.error(f"❌ {error}. Try fewer stocks or a shorter lookback.")
+    render_debug_panel()
+    st.stop()
+if simulation is None:
+    render_debug_panel()
+    st.stop()
+fan, summary, terminal_returns = simulation
+elapsed = time.perf_counter() - t0
+
+st.caption(
+    f"{n_paths:,} paths × {horizon} days × {len(symbols)} stocks "
+    f"({METHODS[method]}) in {elapsed:.2f} s"
+)
+
+# KPI row
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Median Outcome", f"${initial_value * (1 + summary['Median Return']):,.0f}",
+            delta=f"{summary['Median Return']:.1%}")
+col2.metric("Probability of Loss", f"{summary['Probability of Loss']:.1%}")
+col3.metric("VaR (95%)", f"${initial_value * summary['VaR 95%']:,.0f}",
+            help="Loss that is exceeded in only 5% of simulated outcomes")
+col4.metric("CVaR (95%)", f"${initial_value * summary['CVaR 95%']:,.0f}",
+            help="Average loss in the worst 5% of simulated outcomes")
+
+st.markdown("---")
+
+# ====================
+# FAN CHART
+# ====================
+
+st.subheader("📈 Portfolio Value Fan Chart")
+
+with timed_stage("monte_carlo.fan_figure", rows=len(fan)):
+    values = fan * initial_value
+    low, high = f'P{FAN_PERCENTILES[0]}', f'P{FAN_PERCENTILES[-1]}'
+    inner_low, inner_high = f'P{FAN_PERCENTILES[1]}', f'P{FAN_PERCENTILES[-2]}'
+
+    fig1 = go.Figure()
+    for lower, upper, label, opacity in [
+        (low, high, f'{FAN_PERCENTILES[0]}th-{FAN_PERCENTILES[-1]}th percentile', 0.15),
+        (inner_low, inner_high, f'{FAN_PERCENTILES[1]}th-{FAN_PERCENTILES[-2]}th percentile', 0.3),
+    ]:
+        fig1.add_trace(go.Scatter(x=values.index, y=values[upper], mode='lines',
+                                  line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig1.add_trace(go.Scatter(x=values.index, y=values[lower], mode='lines', line=dict(width=0),
+                                  fill='tonexty', fillcolor=f'rgba(31, 119, 180, {opacity})', name=label))
+    fig1.add_trace(go.Scatter(x=values.index, y=values['P50'], mode='lines',
+                              line=dict(color='#1f77b4', width=2), name='Median'))
+
+    fig1.update_layout(
+        title=f'Simulated Value of ${initial_value:,.0f} over {horizon} Trading Days',
+        xaxis_title='Trading Days Ahead',
+        yaxis_title='Portfolio Value ($)',
+        hovermode='x unified',
+        height=500
+    )
+
+st.plotly_chart(fig1, width='stretch')
+
+# ====================
+# OUTCOME DISTRIBUTION
+# ====================
+
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.subheader("📊 Distribution of Final Returns")
+    with timed_stage("monte_carlo.histogram", rows=len(terminal_returns)):
+        fig2 = px.histogram(
+            pd.DataFrame({'Return': terminal_returns}),
+            x='Return',
+            nbins=100,
+            title=f'Return after {horizon} Trading Days',
+            labels={'Return': 'Total Return'}
+        )
+        fig2.add_vline(x=-summary['VaR 95%'], line_dash='dash', line_color='red',
+                       annotation_text='VaR 95%')
+        fig2.update_xaxes(tickformat='.0%')
+        fig2.update_layout(height=400, showlegend=False)
+    st.plotly_chart(fig2, width='stretch')
+
+with col2:
+    st.subheader("📋 Summary")
+    summary_df = pd.DataFrame({'Value': summary}).rename_axis('Statistic')
+    summary_df['In Dollars'] = summary_df['Value'] * initial_value
+    summary_df.loc['Probability of Loss', 'In Dollars'] = float('nan')
+    st.dataframe(
+        summary_df.style.format({'Value': '{:.2%}', 'In Dollars': '${:,.0f}'}, na_rep='-'),
+        width='stretch'
+    )
+
+# How to read this page
+with st.expander("📖 How to Read This Page"):
+    st.markdown("""
+    - **Historical bootstrap:** Each simulated day replays a randomly picked real trading day from the lookback
+      window (all stocks move together as they did that day), keeping crashes and fat tails
+    - **Multivariate normal:** Daily returns are drawn from a normal distribution with the historical mean and
+      covariance of the selected stocks - smoother, thinner-tailed outcomes
+    - **Fan chart:** The shaded bands contain the middle 50% and 90% of simulated paths on each day
+    - **VaR (95%):** The loss you would exceed in only 1 out of 20 simulated outcomes
+    - **CVaR (95%):** The average loss across those worst 1 in 20 outcomes (always at least the VaR)
+    - **Weighting:** Portfolios are bought once at the start and held (no rebalancing)
+    - **Caveat:** Simulations assume the future behaves like the lookback window; they are not predictions
+    """)
+
+st.markdown("---")
+
+# Footer
+st.caption("🎲 Monte Carlo | S&P 500 Portfolio App")
+
+render_debug_panel()
@@ -0,0 +1,141 @@
+import streamlit as st
+import plotly.express as px
+import time
+from similarity import METHODS, get_similarity_index
+from screener import get_company_info
+from price_matrix import get_mode_matrix
+from price_modes import PRICE_MODES, PRICE_MODE_LABELS, PRICE_MODE_HELP
+from instrumentation import timed_stage, render_debug_panel
+
+# Page config
+st.set_page_config(page_title="Similar Stocks", page_icon="🧬", layout="wide")
+
+st.title("🧬 Similar Stocks")
+st.markdown("### Find the stocks that trade most (and least) like a given symbol")
+
+st.markdown("---")
+
+# ====================
+# SIDEBAR SETTINGS
+# ====================
+
+st.sidebar.header("🎛️ Search Settings")
+
+# Setting 1: Lookback window
+st.sidebar.subheader("1. Lookback Window")
+lookback_days = st.sidebar.select_slider(
+    "Compare daily returns over the last:",
+    options=[63, 126, 252, 504, 756],
+    value=252,
+    format_func=lambda days: f"{days} trading days (~{days / 252:.1g} yr)" if days >= 252 else f"{days} trading days"
+)
+
+# Setting 2: Similarity measure
+st.sidebar.subheader("2. Similarity Measure")
+method = st.sidebar.radio(
+    "Measure:",
+    options=list(METHODS),
+    format_func=METHODS.get,
+    horizontal=True
+)
+
+# Setting 3: Result size
+st.sidebar.subheader("3. Results")
+k = st.sidebar.slider("Show top/bottom K:", min_value=5, max_value=30, value=10, step=5)
+
+# Setting 4: Price series
+st.sidebar.subheader("4. Prices")
+price_mode = st.sidebar.radio(
+    "Compute returns from:",
+    options=list(PRICE_MODES),
+    format_func=PRICE_MODE_LABELS.get,
+    help=PRICE_MODE_HELP
+)
+
+st.sidebar.markdown("---")
+st.sidebar.caption("The return index is built once per lookback window and price mode and shared by all users")
+
+with timed_stage("similarity.index_lookup"):
+    index = get_similarity_index(lookback_days, method, price_mode)
+    company_info = get_company_info().drop_duplicates('Symbol').set_index('Symbol')
+
+names = company_info['Shortname'].reindex(index.symbols).fillna('')
+options = sorted(index.symbols)
+default_symbol = 'NVDA' if 'NVDA' in index else options[0]
+
+symbol = st.selectbox(
+    "Find stocks that move like:",
+    options=options,
+    index=options.index(default_symbol),
+    format_func=lambda s: f"{s} - {names.get(s, '')}".rstrip(' -')
+)
+
+# ====================
+# SEARCH
+# ====================
+
+t0 = time.perf_counter()
+with timed_stage("similarity.query", rows=len(index)):
+    most, least = index.query(symbol, k)
+query_ms = (time.perf_counter() - t0) * 1000
+
+st.caption(f"Searched {len(index):,} symbols over {lookback_days} trading days in {query_ms:.1f} ms")
+
+def format_results(results):
+    """
+    Result table with company name and sector.
+    """
+    table = results.join(company_info[['Shortname', 'Sector']], how='left')
+    table = table[['Shortname', 'Sector', 'Similarity']]
+    return table.style.format({'Similarity': '{:.3f}'}).background_gradient(
+        subset=['Similarity'], cmap='RdYlGn', vmin=-1, vmax=1
+    )
+
+col1, col2 = st.columns(2)
+
+with col1:
+    st.subheader(f"🤝 Most Similar to {symbol}")
+    st.dataframe(format_results(most), width='stretch')
+
+with col2:
+    st.subheader(f"↔️ Least Similar to {symbol}")
+    st.dataframe(format_results(least), width='stretch')
+
+# ====================
+# VISUALIZATION
+# ====================
+
+st.subheader(f"📈 {symbol} vs Its 5 Closest Matches")
+
+with timed_stage("similarity.overlay_figure"):
+    peers = [symbol] + list(most.index[:5])
+    prices = get_mode_matrix(price_mode)[peers].iloc[-(lookback_days + 1):]
+    growth = prices / prices.bfill().iloc[0] * 100
+
+    fig = px.line(
+        growth,
+        title=f'Price Growth over the Last {lookback_days} Trading Days (start = 100)',
+        labels={'value': 'Growth of 100', 'Date': 'Date'}
+    )
+    fig.for_each_trace(lambda trace: trace.update(line_width=4) if trace.name == symbol else None)
+    fig.update_layout(hovermode='x unified', height=500)
+
+st.plotly_chart(fig, width='stretch')
+
+# How to read this page
+with st.expander("📖 How to Read This Page"):
+    st.markdown("""
+    - **Similarity:** Computed from daily returns, not price levels, so two stocks can be similar even if their prices differ
+    - **Correlation:** 1 = always move together, 0 = unrelated, -1 = move in opposite directions
+    - **Cosine:** Like correlation but without removing each stock's average daily return first
+    - **Least similar:** Stocks that diversify the chosen one best over this window
+    - **Lookback:** Short windows capture recent regimes; long windows show structural relationships
+    - **Coverage:** Stocks with prices on fewer than 80% of the window's days are left out
+    """)
+
+st.markdown("---")
+
+# Footer
+st.caption("🧬 Similar Stocks | S&P 500 Portfolio App")
+
+render_debug_panel()
@@ -0,0 +1,62 @@
+"""
+Wide Date x Symbol matrices built once from the long stocks table.
+
+Most analytics (screener, indices, simulations, similarity search) work on
+"one column per symbol" arrays, in any of the price modes (raw, split-adjusted,
+total return; see price_modes.py). Pivoting 1.9M rows takes a while, so the
+matrices are built once per data refresh and shared between sessions with
+st.cache_resource. Treat the returned DataFrames as read-only.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from load_data import get_sp500_data, get_dataset_snapshot
+from disk_cache import disk_cache
+from instrumentation import timed_stage
+from price_modes import price_column
+
+
+def build_price_matrix(stocks_df, value='Close'):
+    """
+    Pivots one column of stocks_df into a Date x Symbol float matrix
+    (sorted dates, sorted symbols, NaN where a symbol has no row/price).
+    Duplicate (Date, Symbol) rows keep the last occurrence.
+    """
+    with timed_stage(f"price_matrix.build.{value}", rows=len(stocks_df)):
+        long_df = stocks_df[['Date', 'Symbol', value]].drop_duplicates(['Date', 'Symbol'], keep='last')
+        matrix = long_df.pivot(index='Date', columns='Symbol', values=value).sort_index()
+        matrix = matrix.reindex(sorted(matrix.columns), axis=1).astype(np.float64)
+        matrix.columns.name = 'Symbol'
+    return matrix
+
+
+def daily_returns(prices):
+    """
+    Simple daily returns of a price matrix (first row is NaN).
+    """
+    values = prices.to_numpy()
+    returns = np.full_like(values, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = values[1:] / values[:-1] - 1
+    return pd.DataFrame(returns, index=prices.index, columns=prices.columns)
+
+
+@st.cache_resource(ttl=86400, max_entries=4)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_price_matrix(value='Close'):
+    """
+    Cached Date x Symbol matrix for any stocks column ('Close', 'Adj Close',
+    'Split Close', 'Volume', ...).
+    Shared between sessions; treat as read-only.
+    """
+    _, stocks_df, _ = get_sp500_data()
+    return build_price_matrix(stocks_df, value)
+
+
+def get_mode_matrix(mode='raw'):
+    """
+    Cached price matrix for a price mode ('raw', 'split' or 'total', see
+    price_modes.py). Each mode is built once, so switching is a lookup.
+    """
+    return get_price_matrix(price_column(mode))
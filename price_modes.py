@@ -0,0 +1,93 @@
+"""
+Price modes: which price series a metric is computed from.
+
+  raw    'Close' as shipped in sp500_stocks.csv
+  split  'Split Close': Close with any splits it still contains removed
+  total  'Adj Close': split- and dividend-adjusted (total return)
+
+Yahoo's Close is normally split-adjusted already, so 'split' usually equals
+'raw'; it only differs where a split slipped through unadjusted. Those are
+found by comparing Close with Adj Close: Adj Close / Close moves slowly with
+dividends, but jumps by the split ratio on the day of an unadjusted split
+(Close halves on a 2-for-1 while Adj Close does not). Every earlier Close of
+that symbol is then divided by the ratio.
+
+The loader adds 'Split Close' once, so each mode is just a column of the
+stocks table and a price matrix (price_matrix.get_mode_matrix); switching
+mode never reprocesses the raw rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+PRICE_MODES = {'raw': 'Close', 'split': 'Split Close', 'total': 'Adj Close'}
+
+PRICE_MODE_LABELS = {
+    'raw': 'Raw close',
+    'split': 'Split-adjusted',
+    'total': 'Total return (dividends reinvested)',
+}
+
+PRICE_MODE_HELP = (
+    "Raw close as reported, close with any leftover splits removed, or total return "
+    "(Adj Close: splits and reinvested dividends)"
+)
+
+# Common forward split ratios; reverse splits are their inverses
+SPLIT_RATIOS = np.array([1.5, 2, 3, 4, 5, 6, 7, 8, 10, 15, 20, 30, 40, 50])
+
+# How close (relative) a jump must be to a split ratio to count as one
+SPLIT_TOLERANCE = 0.05
+
+
+def price_column(mode):
+    if mode not in PRICE_MODES:
+        raise ValueError(f"Unknown price mode '{mode}', expected one of {list(PRICE_MODES)}")
+    return PRICE_MODES[mode]
+
+
+def detect_splits(stocks_df, tolerance=SPLIT_TOLERANCE):
+    """
+    Unadjusted splits left in Close: one row per (Symbol, Date) where
+    Adj Close / Close jumps by a split ratio, with that Ratio (2 = 2-for-1,
+    0.5 = 1-for-2 reverse split). Returns (splits, log ratio per row of the
+    Symbol/Date-sorted table, that sorted table's index).
+    """
+    ordered = stocks_df[['Symbol', 'Date', 'Close', 'Adj Close']].sort_values(['Symbol', 'Date'])
+    factor = (ordered['Adj Close'] / ordered['Close']).to_numpy()
+    same_symbol = ordered['Symbol'].eq(ordered['Symbol'].shift()).to_numpy()
+
+    jump = np.full(len(ordered), np.nan)
+    jump[1:] = factor[1:] / factor[:-1]
+    jump[~same_symbol] = np.nan
+
+    # Only jumps of at least ~1.4x can be splits; match those to the nearest ratio
+    ratios = np.concatenate([SPLIT_RATIOS, 1 / SPLIT_RATIOS])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        candidates = np.flatnonzero(np.abs(np.log(jump)) > np.log(1.4))
+    distance = np.abs(jump[candidates, None] / ratios - 1)
+    nearest = distance.argmin(axis=1)
+    matched = distance[np.arange(len(candidates)), nearest] <= tolerance
+
+    is_split = np.zeros(len(ordered), dtype=bool)
+    is_split[candidates[matched]] = True
+    log_ratio = np.zeros(len(ordered))
+    log_ratio[candidates[matched]] = np.log(ratios[nearest[matched]])
+
+    splits = ordered.loc[is_split, ['Symbol', 'Date']].assign(Ratio=ratios[nearest[matched]])
+    return splits.reset_index(drop=True), log_ratio, ordered.index
+
+
+def split_adjusted_close(stocks_df, tolerance=SPLIT_TOLERANCE):
+    """
+    (Split Close series aligned with stocks_df, detected splits).
+    """
+    splits, log_ratio, order = detect_splits(stocks_df, tolerance)
+    if splits.empty:
+        return stocks_df['Close'].copy(), splits
+
+    # Divide each Close by the product of the ratios of all later splits
+    symbols = stocks_df.loc[order, 'Symbol'].to_numpy()
+    later = pd.Series(log_ratio[::-1]).groupby(symbols[::-1]).cumsum().to_numpy()[::-1] - log_ratio
+    adjustment = pd.Series(np.exp(later), index=order).reindex(stocks_df.index)
+    return stocks_df['Close'] / adjustment, splits
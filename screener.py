@@ -0,0 +1,170 @@
+"""
+Stock screener: rank the whole universe by a computed metric.
+
+`compute_metrics` turns the price/volume matrices into one array per metric
+(one value per symbol) for a date window. Ranking then never sorts the full
+universe: `top_k` uses np.argpartition to pull out the K best (or worst)
+values in linear time and only sorts those K.
+
+Works without Streamlit:
+
+    from screener import compute_metrics, leaderboard
+    metrics = compute_metrics(prices, volumes, '2024-01-01', '2024-12-31')
+    top, bottom = leaderboard(metrics, 'period_return', k=10)
+
+The get_* wrappers cache the metric table per window for the Screener page.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from load_data import get_sp500_data, get_dataset_snapshot
+from disk_cache import disk_cache
+from price_matrix import get_price_matrix, get_mode_matrix
+from instrumentation import timed_stage
+
+# Metric key -> display label
+METRICS = {
+    'period_return': 'Period Return',
+    'volatility': 'Volatility (annualized)',
+    'volume_surge': 'Volume Surge (20d vs window avg)',
+    'max_drawdown': 'Max Drawdown',
+    'from_52w_high': 'Distance from 52-Week High',
+}
+
+TRADING_DAYS = 252
+SURGE_DAYS = 20
+
+
+def _first_valid(values):
+    """
+    First non-NaN value in each column (NaN if the column is all NaN).
+    """
+    if len(values) == 0:
+        return np.full(values.shape[1], np.nan)
+    valid = ~np.isnan(values)
+    rows = valid.argmax(axis=0)
+    first = values[rows, np.arange(values.shape[1])]
+    return np.where(valid.any(axis=0), first, np.nan)
+
+
+def _last_valid(values):
+    return _first_valid(values[::-1])
+
+
+def compute_metrics(prices, volumes, start_date, end_date):
+    """
+    Computes every screener metric for each symbol over [start_date, end_date].
+
+    prices and volumes are Date x Symbol matrices (see price_matrix.py).
+    Returns a DataFrame indexed by Symbol with one column per METRICS key,
+    all NaN if the window holds no trading day (e.g. a single weekend date).
+    """
+    start_date, end_date = pd.to_datetime(start_date), pd.to_datetime(end_date)
+    window = prices.loc[start_date:end_date].to_numpy()
+    if len(window) == 0:
+        return pd.DataFrame(np.nan, index=prices.columns, columns=list(METRICS))
+    window_volume = volumes.reindex(columns=prices.columns).loc[start_date:end_date].to_numpy()
+
+    # 52-week high looks back a full year from the end of the window
+    history = prices.loc[:end_date].to_numpy()[-TRADING_DAYS:]
+
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+
+        first, last = _first_valid(window), _last_valid(window)
+        period_return = last / first - 1
+
+        returns = window[1:] / window[:-1] - 1
+        volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+
+        volume_surge = np.nanmean(window_volume[-SURGE_DAYS:], axis=0) / np.nanmean(window_volume, axis=0)
+
+        running_max = np.fmax.accumulate(window, axis=0)
+        max_drawdown = np.nanmin(window / running_max - 1, axis=0)
+
+        from_52w_high = _last_valid(history) / np.nanmax(history, axis=0) - 1
+
+    return pd.DataFrame({
+        'period_return': period_return,
+        'volatility': volatility,
+        'volume_surge': volume_surge,
+        'max_drawdown': max_drawdown,
+        'from_52w_high': from_52w_high,
+    }, index=prices.columns)
+
+
+def top_k(values, k, largest=True):
+    """
+    Positions of the k largest (or smallest) values, best first. NaNs never
+    make the list. Uses argpartition, so cost is O(n + k log k).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    keys = -values if largest else values
+    keys = np.where(np.isnan(keys), np.inf, keys)
+
+    valid = int((~np.isnan(values)).sum())
+    k = min(k, valid)
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+
+    if k < len(keys):
+        candidates = np.argpartition(keys, k - 1)[:k]
+    else:
+        candidates = np.arange(len(keys))
+    return candidates[np.argsort(keys[candidates], kind='stable')]
+
+
+def leaderboard(metrics, metric, k=10):
+    """
+    Returns (top, bottom) DataFrames with the k highest and k lowest symbols
+    for one metric column of a compute_metrics table.
+    """
+    values = metrics[metric].to_numpy()
+    top = metrics.iloc[top_k(values, k, largest=True)]
+    bottom = metrics.iloc[top_k(values, k, largest=False)]
+    return top, bottom
+
+
+def screen(stocks_df, companies_df, metric, start_date, end_date, k=10):
+    """
+    One-call headless screener from the raw dataframes. Builds the matrices,
+    so prefer compute_metrics + leaderboard when screening repeatedly.
+    """
+    from price_matrix import build_price_matrix
+
+    prices = build_price_matrix(stocks_df, 'Close')
+    volumes = build_price_matrix(stocks_df, 'Volume')
+    metrics = compute_metrics(prices, volumes, start_date, end_date)
+    top, bottom = leaderboard(metrics, metric, k)
+    return with_company_info(top, companies_df), with_company_info(bottom, companies_df)
+
+
+def with_company_info(board, companies_df):
+    """
+    Adds Shortname and Sector to a leaderboard (index = Symbol).
+    """
+    info = companies_df.set_index('Symbol')[['Shortname', 'Sector']]
+    return board.join(info, how='left')
+
+
+@st.cache_data(ttl=86400, max_entries=32)
+@disk_cache(snapshot=get_dataset_snapshot)
+def get_screener_metrics(start_date, end_date, mode='raw'):
+    """
+    Metric table for one window and price mode, cached so switching metric
+    or K only re-ranks.
+    """
+    with timed_stage("screener.metrics") as stage:
+        prices = get_mode_matrix(mode)
+        metrics = compute_metrics(prices, get_price_matrix('Volume'), start_date, end_date)
+        stage.rows = prices.size
+    return metrics
+
+
+@st.cache_data(ttl=86400)
+def get_company_info():
+    companies_df, _, _ = get_sp500_data()
+    return companies_df[['Symbol', 'Shortname', 'Sector']]
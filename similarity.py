@@ -0,0 +1,130 @@
+"""
+Similarity search: which stocks trade like a given symbol?
+
+Every symbol's daily returns over a lookback window become one row of a
+compact float32 matrix. Rows are demeaned and scaled to unit length, so the
+dot product of two rows is their Pearson correlation ('correlation') -
+or, without demeaning, the cosine similarity of the raw return vectors
+('cosine'). A query is one BLAS matrix-vector product against the whole
+universe followed by a partial sort (screener.top_k), i.e. milliseconds.
+
+Missing returns are filled with 0 after demeaning (the symbol's own mean),
+which is the usual pairwise-complete approximation. Symbols with prices on
+fewer than MIN_COVERAGE of the window's days are left out.
+
+Works without Streamlit:
+
+    from similarity import SimilarityIndex
+    index = SimilarityIndex.from_prices(prices, lookback_days=252)
+    most, least = index.query('NVDA', k=10)
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from price_matrix import get_mode_matrix, build_price_matrix
+from screener import top_k
+from instrumentation import timed_stage
+
+METHODS = {'correlation': 'Correlation', 'cosine': 'Cosine'}
+
+MIN_COVERAGE = 0.8
+
+
+def return_vectors(prices, lookback_days=252, method='correlation'):
+    """
+    Unit-length float32 return vectors (Symbol x Day) for the last
+    lookback_days returns of a price matrix. Returns (symbols, vectors).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {list(METHODS)}")
+
+    window = prices.iloc[-(lookback_days + 1):].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = (window[1:] / window[:-1] - 1).T
+
+    valid = np.isfinite(returns)
+    keep = valid.mean(axis=1) >= MIN_COVERAGE
+    returns, valid = returns[keep], valid[keep]
+
+    returns = np.where(valid, returns, 0.0)
+    if method == 'correlation':
+        means = returns.sum(axis=1) / valid.sum(axis=1)
+        returns = np.where(valid, returns - means[:, None], 0.0)
+
+    norms = np.linalg.norm(returns, axis=1)
+    keep_norm = norms > 0
+    vectors = (returns[keep_norm] / norms[keep_norm, None]).astype(np.float32)
+    symbols = prices.columns.to_numpy()[keep][keep_norm]
+    return symbols, vectors
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index over normalized return vectors.
+    """
+
+    def __init__(self, symbols, vectors):
+        self.symbols = np.asarray(symbols)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_prices(cls, prices, lookback_days=252, method='correlation'):
+        return cls(*return_vectors(prices, lookback_days, method))
+
+    def __contains__(self, symbol):
+        return symbol in self.positions
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def scores(self, symbol):
+        """
+        Similarity of every indexed symbol to `symbol` (Series, includes itself).
+        """
+        if symbol not in self.positions:
+            raise KeyError(f"'{symbol}' is not in the index (missing or too little price history)")
+        values = self.vectors @ self.vectors[self.positions[symbol]]
+        return pd.Series(values.astype(np.float64), index=pd.Index(self.symbols, name='Symbol'), name='Similarity')
+
+    def query(self, symbol, k=10):
+        """
+        Returns (most_similar, least_similar) DataFrames with a Similarity
+        column, best first. The query symbol itself is excluded.
+        """
+        scores = self.scores(symbol).drop(symbol)
+        values = scores.to_numpy()
+        most = scores.iloc[top_k(values, k, largest=True)].to_frame()
+        least = scores.iloc[top_k(values, k, largest=False)].to_frame()
+        return most, least
+
+    def correlation(self):
+        """
+        Full Symbol x Symbol similarity matrix (one float32 matmul).
+        """
+        return self.vectors @ self.vectors.T
+
+
+def similar_to(stocks_df, companies_df, symbol, lookback_days=252, k=10, method='correlation'):
+    """
+    One-call headless search from the raw dataframes. Builds the index, so
+    prefer SimilarityIndex + query when searching repeatedly.
+    """
+    index = SimilarityIndex.from_prices(build_price_matrix(stocks_df, 'Close'), lookback_days, method)
+    info = companies_df.set_index('Symbol')[['Shortname', 'Sector']]
+    most, least = index.query(symbol, k)
+    return most.join(info, how='left'), least.join(info, how='left')
+
+
+@st.cache_resource(ttl=86400, max_entries=8)
+def get_similarity_index(lookback_days=252, method='correlation', mode='raw'):
+    """
+    Index for one lookback window and price mode, shared between sessions.
+    Treat as read-only.
+    """
+    with timed_stage("similarity.build") as stage:
+        prices = get_mode_matrix(mode)
+        index = SimilarityIndex.from_prices(prices, lookback_days, method)
+        stage.rows = index.vectors.size
+    return index
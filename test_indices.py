@@ -0,0 +1,118 @@
+"""
+Regression tests for incremental index updates (indices.update_indices):
+an update must equal a full rebuild, and a release that changed history or
+constituents must be rebuilt rather than extended.
+
+    python -m pytest -q test_indices.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indices import build_indices, implied_shares, update_indices, _extends
+
+SECTORS = ['Technology', 'Energy', 'Utilities']
+
+
+def make_release(n_symbols=12, n_days=300, seed=0):
+    """
+    Close and Adj Close matrices (Adj Close with a dividend factor) plus a
+    companies table; one symbol lists late so the matrix has leading NaNs.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2023-01-02', periods=n_days, name='Date')
+    symbols = pd.Index([f'S{i:02d}' for i in range(n_symbols)], name='Symbol')
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, n_symbols)), axis=0))
+    close[:40, 3] = np.nan
+    prices = pd.DataFrame(close, index=dates, columns=symbols)
+    adj = prices * np.linspace(0.9, 1.0, n_days)[:, None]
+    companies = pd.DataFrame({
+        'Symbol': symbols,
+        'Sector': [SECTORS[i % len(SECTORS)] for i in range(n_symbols)],
+        'Marketcap': rng.uniform(1e9, 1e11, n_symbols),
+    })
+    return prices, adj, companies
+
+
+def rescale_history(adj, before, factor):
+    """
+    Adj Close as a later release reports it after a dividend on `before`:
+    every earlier value is scaled by the same factor.
+    """
+    adj = adj.copy()
+    adj.loc[adj.index < before] *= factor
+    return adj
+
+
+@pytest.mark.parametrize('weighting', ['cap', 'equal'])
+def test_update_equals_full_rebuild(weighting):
+    prices, adj, companies = make_release()
+    old = update_indices(prices.iloc[:-60], adj.iloc[:-60], companies, 'Sector', weighting)
+
+    # The new release adds 60 days and a dividend inside them
+    new_adj = rescale_history(adj, prices.index[-30], 0.98)
+    assert _extends(old, prices, new_adj, companies, 'Sector')
+
+    levels, shares, _ = update_indices(prices, new_adj, companies, 'Sector', weighting, old)
+    full = build_indices(prices, new_adj, companies, 'Sector', weighting, old[1].to_numpy())
+    pd.testing.assert_frame_equal(levels, full, check_freq=False, rtol=1e-10)
+    pd.testing.assert_series_equal(shares, old[1])
+
+
+def test_revised_history_is_rebuilt():
+    prices, adj, companies = make_release()
+    old = update_indices(prices.iloc[:-60], adj.iloc[:-60], companies)
+
+    revised_prices, revised_adj = prices.copy(), adj.copy()
+    revised_prices.iloc[100, 0] *= 1.5
+    revised_adj.iloc[100, 0] *= 1.5
+    assert not _extends(old, revised_prices, revised_adj, companies, 'Sector')
+
+    levels, shares, _ = update_indices(revised_prices, revised_adj, companies, state=old)
+    fresh = implied_shares(revised_prices, companies)
+    full = build_indices(revised_prices, revised_adj, companies, 'Sector', 'cap', fresh)
+    pd.testing.assert_frame_equal(levels, full, check_freq=False)
+    np.testing.assert_allclose(shares.to_numpy(), fresh)
+
+
+def test_split_adjusted_close_is_rebuilt():
+    prices, adj, companies = make_release()
+    old = update_indices(prices.iloc[:-60], adj.iloc[:-60], companies)
+
+    # A 2-for-1 split in the new days halves every earlier Close
+    split_prices = prices.copy()
+    split_prices.iloc[:-20, 5] /= 2
+    assert not _extends(old, split_prices, adj, companies, 'Sector')
+
+
+def test_new_constituent_is_rebuilt():
+    prices, adj, companies = make_release()
+    old_symbols = prices.columns[:-1]
+    old = update_indices(prices.iloc[:-60][old_symbols], adj.iloc[:-60][old_symbols], companies)
+    assert not _extends(old, prices, adj, companies, 'Sector')
+
+    levels, _, _ = update_indices(prices, adj, companies, state=old)
+    full = build_indices(prices, adj, companies, 'Sector', 'cap', implied_shares(prices, companies))
+    pd.testing.assert_frame_equal(levels, full, check_freq=False)
+
+
+def test_other_dataset_is_rebuilt():
+    """
+    A state built from another dataset that ends on the same date is not reused.
+    """
+    prices, adj, companies = make_release(seed=0)
+    other_prices, other_adj, _ = make_release(seed=1)
+    old = update_indices(other_prices.iloc[20:], other_adj.iloc[20:], companies)
+    assert not _extends(old, prices, adj, companies, 'Sector')
+
+    levels, _, _ = update_indices(prices, adj, companies, state=old)
+    full = build_indices(prices, adj, companies, 'Sector', 'cap', implied_shares(prices, companies))
+    pd.testing.assert_frame_equal(levels, full, check_freq=False)
+
+
+def test_regrouped_symbol_is_rebuilt():
+    prices, adj, companies = make_release()
+    old = update_indices(prices.iloc[:-60], adj.iloc[:-60], companies)
+    moved = companies.assign(Sector=companies['Sector'].where(companies['Symbol'] != 'S00', 'Energy'))
+    assert not _extends(old, prices, adj, moved, 'Sector')